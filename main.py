@@ -1,12 +1,16 @@
 """Main script for processing payment rejection CSV files and posting to IDX system."""
 
+import argparse
+import math
 import os
+import queue
 import shutil
+import threading
 import time
+from dataclasses import dataclass, field
 from datetime import datetime
-from glob import glob
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional
 
 from dotenv import load_dotenv
 from loguru import logger
@@ -14,8 +18,10 @@ from selenium import webdriver
 from tqdm import tqdm
 
 from pages.login_page import LoginPage
+from pages.modals.modal_watcher import ModalWatcher
 from pages.modals.payment_code import PaymentCodesModal
 from pages.modals.reset_modal import ResetModal
+from pages.navigation import Navigator
 from pages.open_settings import SettingsPage
 from pages.open_vtb import VTBPage
 from pages.post_receipts.pp_bulk import PP_Bulk
@@ -24,18 +30,45 @@ from pages.post_receipts.pp_lipp_rejections import PP_LIPP_Rejections
 from pages.post_receipts.pp_main import PICScreen_Main
 from pages.pp_batch import PaymentPostingBatch
 from pages.pp_select_patient import PP_SelectPatient
+from utils.command_stats import CommandAccountant, track_rejection
 from utils.database import DBManager, Rejections
+from utils.discovery import InputDiscovery
 from utils.file_reader import InputFile
+from utils.ingest import ingest_files
 from utils.log_cleanup import cleanup_old_logs
 from utils.notify import send_error_notification
+from utils.paycode_cache import PaycodeCache
 from utils.screenshot import ScreenshotManager
+from utils.staging import ArchiveMover, StagingArea
+from utils.tracing import close_tracing, configure_tracing, span, traced
+from utils.waits import wait_for_idle
 
 # Constants
 INPUT_FILE_PATH = '//NT2KWB972SRV03/SHAREDATA/CPP-Data/CBO Westbury Managers/LEADERSHIP/Bot Folder/ORCCA Rejection Scripting'
 CHROME_SCALE_FACTOR = 0.75
 REMOTE_DEBUG_PORT = 9222
-BATCH_OPEN_RETRY_SLEEP = 2  # seconds
 LOG_RETENTION_DAYS = 7  # Keep logs for 7 days
+DEFAULT_WORKERS = 1
+MIN_SHARD_SIZE = 20  # Don't split a group into shards smaller than this
+MAX_CONSECUTIVE_FAILURES = 3
+WORKER_POLL_INTERVAL = 1  # seconds
+WATCH_POLL_SECONDS = 10
+
+INPUT_DISCOVERY = InputDiscovery(INPUT_FILE_PATH)
+
+
+@dataclass
+class WorkItem:
+    """A slice of one group's pending rejections, posted by a single worker in one batch.
+    
+    The rejections may come from several input files; each keeps its own FileName.
+    """
+    
+    file_names: List[str]
+    group: int
+    rejections: List[Rejections] = field(default_factory=list)
+    shard: int = 1
+    total_shards: int = 1
 
 
 def setup_logging(log_folder_path: Path) -> None:
@@ -67,6 +100,29 @@ def setup_logging(log_folder_path: Path) -> None:
     )
 
 
+def add_worker_log_sink(worker_log_path: Path, worker_id: int) -> int:
+    """Add a debug log file that only receives records emitted by one worker.
+    
+    Args:
+        worker_log_path: Directory for this worker's logs and screenshots
+        worker_id: Worker number bound to log records via ``logger.contextualize``
+        
+    Returns:
+        The loguru sink id, so the sink can be removed when the worker exits
+    """
+    timestamp = datetime.now().strftime("%Y-%m-%d %H %M")
+    return logger.add(
+        worker_log_path / f"debug_{timestamp}.log",
+        rotation="5 MB",
+        level="DEBUG",
+        backtrace=True,
+        diagnose=True,
+        retention="3 days",
+        compression="zip",
+        filter=lambda record: record["extra"].get("worker") == worker_id
+    )
+
+
 def get_log_folder_path() -> Path:
     """Create and return the log folder path based on current date and time."""
     now = datetime.now()
@@ -78,46 +134,27 @@ def get_log_folder_path() -> Path:
 def get_files_to_process() -> List[str]:
     """Find CSV files to process based on current date or environment override.
     
+    Lists the input folder once per call (see ``InputDiscovery``); the files'
+    sizes and mtimes are kept in ``INPUT_DISCOVERY.signatures``.
+    
     Returns:
         List of file paths to process
     """
-    now = datetime.now()
-    
-    # Generate date patterns (zero-padded)
-    date_patterns = [
-        now.strftime("%m_%d_%Y"),  # 01_05_2026
-        now.strftime("%m_%d_%y"),  # 01_05_26
-        now.strftime("%m.%d.%y"),  # 01.05.26
-    ]
-    
-    # Add non-zero-padded variants for single-digit months/days
-    # e.g., "1.5.26" instead of "01.05.26"
-    month = now.month
-    day = now.day
-    year_2digit = now.strftime("%y")
-    
-    date_patterns.extend([
-        f"{month}.{day}.{year_2digit}",
-        f"{month}_{day}_{year_2digit}", 
-    ])
-    
-    file_name_override = os.getenv("FILE_NAME_OVERRIDE", "").strip()
-    if file_name_override:
-        file_pattern = f'*{file_name_override}*.csv'
-        files = glob(f'{INPUT_FILE_PATH}/{file_pattern}')
-    else:
-        # Search for all date patterns
-        files = []
-        for pattern in date_patterns:
-            files.extend(glob(f'{INPUT_FILE_PATH}/*{pattern}*.csv'))
-    
+    files = INPUT_DISCOVERY.scan()
     logger.debug(f"Files to process: {files}")
     return files
 
 
-def create_chrome_driver() -> webdriver.Chrome:
+def create_chrome_driver(
+    worker_id: int = 1,
+    command_accountant: Optional[CommandAccountant] = None
+) -> webdriver.Chrome:
     """Create and configure Chrome WebDriver based on environment settings.
     
+    Args:
+        worker_id: Worker number; each worker gets its own remote debugging port
+        command_accountant: If given, counts and times every WebDriver command the driver issues
+        
     Returns:
         Configured Chrome WebDriver instance
     """
@@ -131,15 +168,19 @@ def create_chrome_driver() -> webdriver.Chrome:
         options.add_argument('--disable-dev-shm-usage')
     else:
         # Add remote debugging for non-production
-        options.add_argument(f"--remote-debugging-port={REMOTE_DEBUG_PORT}")
+        options.add_argument(f"--remote-debugging-port={REMOTE_DEBUG_PORT + worker_id - 1}")
     
-    return webdriver.Chrome(options=options)
+    driver = webdriver.Chrome(options=options)
+    if command_accountant is not None:
+        command_accountant.install(driver)
+    return driver
 
 
+@traced("recover_from_fatal_error")
 def recover_from_fatal_error(
     driver: webdriver.Chrome,
     settings_page: SettingsPage,
-    vtb: VTBPage,
+    navigator: Navigator,
     pp_batch: PaymentPostingBatch,
     login_page: LoginPage,
     group: int,
@@ -151,7 +192,7 @@ def recover_from_fatal_error(
     Args:
         driver: Selenium WebDriver instance
         settings_page: Settings page object
-        vtb: VTB page object
+        navigator: Navigation state tracker for this session
         pp_batch: Payment posting batch page object
         login_page: Login page object
         group: Group number to restore
@@ -167,30 +208,30 @@ def recover_from_fatal_error(
         # Try to logout
         try:
             settings_page.logout()
-            time.sleep(2)
         except Exception as logout_error:
             logger.warning(f"Logout failed during recovery: {logout_error}")
         
         # Re-login
         login_page.navigate_to_login()
-        time.sleep(2)
         
         if not login_page.login(username, password):
             logger.error("Login failed during recovery")
             return False
         
         logger.info("Successfully logged back in")
+        ModalWatcher(driver).install()
         
-        # Restore group and VTB selection
-        settings_page.change_group(group)
-        time.sleep(1)
-        
-        if not vtb.validate_current_selection("Payment Posting"):
-            vtb.select_vtb_option("Payment Posting")
+        # Restore group and VTB selection; the session is new, so nothing tracked still holds
+        navigator.reset()
+        navigator.ensure(group, "Payment Posting")
+        wait_for_idle(driver)
         
         # Re-open batch
-        pp_batch.open_batch()
-        time.sleep(BATCH_OPEN_RETRY_SLEEP)
+        if not pp_batch.open_batch():
+            logger.error("Failed to re-open batch during recovery")
+            return False
+        navigator.batch_opened(pp_batch.batch_number)
+        wait_for_idle(driver)
         
         logger.success("Recovery successful - ready to continue processing")
         return True
@@ -200,13 +241,29 @@ def recover_from_fatal_error(
         return False
 
 
+def _lookup_paycode(driver: webdriver.Chrome) -> str | None:
+    """Open the Payment Codes modal and read the group's MANUAL paycode.
+    
+    Args:
+        driver: Selenium WebDriver instance
+        
+    Returns:
+        The paycode, or None/empty if no single MANUAL code was found
+    """
+    pic_screen = PICScreen_Main(driver)
+    pic_screen.open_paycode_modal()
+    pc_modal = PaymentCodesModal(driver)
+    return pc_modal.get_paycode_options()
+
+
 def process_rejection(
     rejection: Rejections,
     driver: webdriver.Chrome,
     screenshot_manager: ScreenshotManager,
     db_manager: DBManager,
     batch_number: str,
-    pp_batch: PaymentPostingBatch
+    pp_batch: PaymentPostingBatch,
+    paycode_cache: Optional[PaycodeCache] = None
 ) -> bool:
     """Process a single rejection record.
     
@@ -217,6 +274,7 @@ def process_rejection(
         db_manager: Database manager for persistence
         batch_number: Current batch number
         pp_batch: Payment posting batch page object
+        paycode_cache: Cache of resolved paycodes; the modal only opens on a miss
         
     Returns:
         True if processing succeeded, False otherwise
@@ -226,26 +284,31 @@ def process_rejection(
         logger.info(f"Processing patient: {rejection.InvoiceNumber} in batch: {batch_number}")
 
         # Select patient
-        select_patient = PP_SelectPatient(driver, screenshot_manager)
-        select_patient.reset_patient()
-        patient_changed = select_patient.select_patient(str(rejection.InvoiceNumber))
+        with span("patient_select"):
+            select_patient = PP_SelectPatient(driver, screenshot_manager)
+            select_patient.reset_patient()
+            patient_changed = select_patient.select_patient(str(rejection.InvoiceNumber))
         
         if patient_changed is not True and patient_changed:
             rejection.Comment = f"Modal detected during patient selection: {patient_changed}"
-            db_manager.update_row(rejection)
+            db_manager.update_row(rejection, flush=True)
             return 'group' not in patient_changed.lower()
 
         # Handle paycode
+        paycode_from_cache = False
         if not rejection.Paycode:
-            pic_screen = PICScreen_Main(driver)
-            pic_screen.open_paycode_modal()
-            pc_modal = PaymentCodesModal(driver)
-            paycode = pc_modal.get_paycode_options()
+            with span("paycode_resolve"):
+                paycode = paycode_cache.get(rejection.Group) if paycode_cache else None
+                paycode_from_cache = bool(paycode)
+                if not paycode:
+                    paycode = _lookup_paycode(driver)
+                    if paycode and paycode_cache:
+                        paycode_cache.put(rejection.Group, paycode)
             
             if not paycode:
                 logger.warning(f"No valid paycode found for patient {rejection.InvoiceNumber}, skipping.")
                 rejection.Comment = "No valid paycode found"
-                db_manager.update_row(rejection)
+                db_manager.update_row(rejection, flush=True)
                 return False
                 
             rejection.Paycode = paycode
@@ -253,44 +316,61 @@ def process_rejection(
         db_manager.update_row(rejection)
         
         # Enter paycode
-        pic_screen = PICScreen_Main(driver)
-        if not pic_screen.enter_paycode(rejection.Paycode):
+        with span("paycode_entry"):
+            pic_screen = PICScreen_Main(driver)
+            paycode_entered = pic_screen.enter_paycode(rejection.Paycode)
+            
+            if not paycode_entered and paycode_from_cache and paycode_cache:
+                # IDX rejected the cached code; refresh it from the modal and retry once
+                logger.warning(f"Cached paycode {rejection.Paycode} rejected for group {rejection.Group}, refreshing.")
+                paycode_cache.invalidate(rejection.Group)
+                paycode = _lookup_paycode(driver)
+                if paycode:
+                    paycode_cache.put(rejection.Group, paycode)
+                    rejection.Paycode = paycode
+                    db_manager.update_row(rejection)
+                    paycode_entered = pic_screen.enter_paycode(rejection.Paycode)
+        
+        if not paycode_entered:
             logger.warning(f"Failed to enter paycode for patient {rejection.InvoiceNumber}, skipping.")
             rejection.Comment = "Failed to enter paycode"
-            db_manager.update_row(rejection)
+            db_manager.update_row(rejection, flush=True)
             return False
+        
+        with span("checkbox_modal"):
+            pic_screen.set_line_item_post_checkbox(rejection.LineItemPost)
             
-        pic_screen.set_line_item_post_checkbox(rejection.LineItemPost)
-        
-        # Handle potential modal after checkbox
-        reset_modal = ResetModal(driver, screenshot_manager)
-        modal_text = reset_modal.close_if_present()
-        
-        if modal_text:
-            logger.info(f"Modal detected during rejection entry: {modal_text}")
-            if modal_text == 'Line Item Payments Only':
-                if not pic_screen.enter_paycode(rejection.Paycode):
-                    logger.warning(f"Failed to enter paycode for patient {rejection.InvoiceNumber}, skipping.")
-                    rejection.Comment = "Failed to enter paycode"
-                    db_manager.update_row(rejection)
-                    return False
-                pic_screen.set_line_item_post_checkbox(rejection.LineItemPost)
+            # Handle potential modal after checkbox
+            reset_modal = ResetModal(driver, screenshot_manager)
+            modal_text = reset_modal.close_if_present()
+            
+            if modal_text:
+                logger.info(f"Modal detected during rejection entry: {modal_text}")
+                if modal_text == 'Line Item Payments Only':
+                    if not pic_screen.enter_paycode(rejection.Paycode):
+                        logger.warning(f"Failed to enter paycode for patient {rejection.InvoiceNumber}, skipping.")
+                        rejection.Comment = "Failed to enter paycode"
+                        db_manager.update_row(rejection, flush=True)
+                        return False
+                    pic_screen.set_line_item_post_checkbox(rejection.LineItemPost)
         
         # Process based on line item post flag
         if rejection.LineItemPost:
-            posted = _process_line_item_post(rejection, driver, screenshot_manager)
+            with span("lipp_post"):
+                posted = _process_line_item_post(rejection, driver, screenshot_manager)
         else:
-            posted = _process_bulk_post(rejection, driver)
+            with span("bulk_post"):
+                posted = _process_bulk_post(rejection, driver)
         
         if posted:
             rejection.Completed = True
-            db_manager.update_row(rejection)
+            db_manager.update_row(rejection, flush=True)
             return True
         else:
             logger.error(f"Failed to post for patient {rejection.InvoiceNumber}")
             screenshot_manager.capture_error_screenshot(f"Failed posting for patient {rejection.InvoiceNumber}")
             rejection.Comment = "Failed to post, did not post rejection to all lines"
-            db_manager.update_row(rejection)
+            db_manager.update_row(rejection, flush=True)
             pp_batch.open_batch()
             return False
             
@@ -348,11 +428,21 @@ def _process_line_item_post(
         num_cpts_to_post += 1
     
     # Process remaining CPT rows
-    for cpt_row in range(starting_index + 1, num_cpts_to_post + 1):
-        logger.debug(f"Processing CPT row {cpt_row} of {num_cpts_to_post}")
-        pp_lipp.populate_row(cpt_row, rejection)
+    remaining_rows = list(range(starting_index + 1, num_cpts_to_post + 1))
+    bulk_posting = os.getenv("LIPP_BULK_POSTING", "1").strip().lower() not in {"0", "false", "no"}
+    if bulk_posting and remaining_rows:
+        # Rows that do not verify are already retried per row; like the per-row path,
+        # carry on to finalize rather than cancel the whole posting
+        failed_rows = pp_lipp.populate_rows_bulk(remaining_rows, rejection)
+        if failed_rows:
+            logger.warning(f"Rows {failed_rows} for patient {rejection.InvoiceNumber} did not verify after per-row retry")
+    else:
+        for cpt_row in remaining_rows:
+            logger.debug(f"Processing CPT row {cpt_row} of {num_cpts_to_post}")
+            pp_lipp.populate_row(cpt_row, rejection)
     
-    return pp_lipp.finalize_posting()
+    with span("finalize"):
+        return pp_lipp.finalize_posting()
 
 
 def _process_bulk_post(rejection: Rejections, driver: webdriver.Chrome) -> bool:
@@ -367,7 +457,8 @@ def _process_bulk_post(rejection: Rejections, driver: webdriver.Chrome) -> bool:
     """
     pp_bulk = PP_Bulk(driver)
     if pp_bulk.enter_bulk_pp_screen():
-        return pp_bulk.enter_rejection_remarks(rejection)
+        with span("finalize"):
+            return pp_bulk.enter_rejection_remarks(rejection)
     return False
 
 
@@ -375,7 +466,8 @@ def archive_file_if_complete(
     file_path: str,
     file_name: str,
     groups: List[int],
-    db_manager: DBManager
+    db_manager: DBManager,
+    archiver: Optional[ArchiveMover] = None
 ) -> None:
     """Archive file if all rejections for all groups are processed.
     
@@ -384,14 +476,11 @@ def archive_file_if_complete(
         file_name: Base name of the file
         groups: List of all group numbers in the file
         db_manager: Database manager for checking completion status
+        archiver: If given, the move is queued on it instead of done right away
     """
     # Check if all groups have been fully processed
-    incomplete_groups = []
-    
-    for group in groups:
-        unposted_invoices = db_manager.get_unposted_invoices(file_name, group)
-        if unposted_invoices:
-            incomplete_groups.append(group)
+    counts = db_manager.get_completion_counts(file_name)
+    incomplete_groups = [group for group in groups if counts.get(group, {}).get("pending")]
     
     if incomplete_groups:
         logger.warning(
@@ -402,18 +491,437 @@ def archive_file_if_complete(
             f"File {file_name} not archived - incomplete groups: {incomplete_groups}")
     else:
         archive_dir = Path(INPUT_FILE_PATH) / "ARCHIVE"
+        if archiver is not None:
+            archiver.add(file_path, archive_dir)
+            return
         archive_dir.mkdir(exist_ok=True)
         shutil.move(file_path, archive_dir / file_name)
         logger.info(f"Archived {file_name} to {archive_dir} (all groups completed)")
 
 
-def main() -> None:
-    """Main entry point for the rejection processing script."""
+def build_work_items(file_group_data: Dict[str, Dict[int, List[Rejections]]], workers: int) -> List[WorkItem]:
+    """Merge the pending rejections of every file by group and split them into work items.
+    
+    Each group is visited once however many files touch it, so its batch is opened
+    once. With a single worker each group is one item. With more workers, large
+    groups are sharded so idle workers can post parts of the same group in
+    parallel, each in its own batch.
+    
+    Args:
+        file_group_data: Pending rejections keyed by file name, then group number
+        workers: Number of workers in the pool
+        
+    Returns:
+        List of work items, in group order
+    """
+    merged: Dict[int, List[Rejections]] = {}
+    for group_data in file_group_data.values():
+        for group, rejections in group_data.items():
+            merged.setdefault(group, []).extend(rejections)
+    
+    items = []
+    for group in sorted(merged):
+        rejections = merged[group]
+        if not rejections:
+            logger.info(f"No data for group {group}, skipping.")
+            continue
+        file_names = list(dict.fromkeys(r.FileName for r in rejections))
+        
+        shard_size = len(rejections)
+        if workers > 1:
+            shard_size = max(MIN_SHARD_SIZE, math.ceil(len(rejections) / workers))
+        total_shards = math.ceil(len(rejections) / shard_size)
+        
+        for shard in range(total_shards):
+            items.append(WorkItem(
+                file_names=file_names,
+                group=group,
+                rejections=rejections[shard * shard_size:(shard + 1) * shard_size],
+                shard=shard + 1,
+                total_shards=total_shards
+            ))
+    return items
+
+
+def post_work_item(
+    item: WorkItem,
+    worker_id: int,
+    driver: webdriver.Chrome,
+    screenshot_manager: ScreenshotManager,
+    db_manager: DBManager,
+    login: LoginPage,
+    settings_page: SettingsPage,
+    navigator: Navigator,
+    pp_batch: PaymentPostingBatch,
+    username: str,
+    password: str,
+    paycode_cache: Optional[PaycodeCache] = None
+) -> None:
+    """Post every rejection in a work item within one batch, recovering from repeated failures.
+    
+    Args:
+        item: The work item to post
+        worker_id: Worker number (used for progress display)
+        driver: This worker's Selenium WebDriver instance
+        screenshot_manager: This worker's screenshot manager
+        db_manager: Shared database manager
+        login: This worker's login page object
+        settings_page: This worker's settings page object
+        navigator: This worker's navigation state tracker
+        pp_batch: This worker's payment posting batch page object
+        username: IDX username
+        password: IDX password
+        paycode_cache: Shared cache of resolved paycodes
+    """
+    group = item.group
+    
+    # Ensure correct group and VTB selection (no navigation if already there)
+    navigator.ensure(group, "Payment Posting")
+    
+    # Open batch, unless the previous work item left one open for this group
+    batch_number = navigator.open_batch_for(group)
+    if batch_number:
+        logger.debug(f"Batch {batch_number} is still open for group {group}, reusing it")
+    else:
+        pp_batch.open_batch()
+        batch_number = pp_batch.batch_number
+        navigator.batch_opened(batch_number)
+    logger.info(
+        f"Processing group {group} (shard {item.shard}/{item.total_shards}) "
+        f"from {', '.join(item.file_names)} with batch number: {batch_number}"
+    )
+    wait_for_idle(driver)
+    
+    # Track consecutive failures for recovery logic
+    consecutive_failures = 0
+    
+    for rejection in tqdm(
+        item.rejections,
+        total=len(item.rejections),
+        desc=f"Worker {worker_id} group {group}",
+        position=worker_id - 1
+    ):
+        with track_rejection(driver, rejection.InvoiceNumber), \
+                span("rejection", invoice=rejection.InvoiceNumber, group=group):
+            success = process_rejection(
+                rejection=rejection,
+                driver=driver,
+                screenshot_manager=screenshot_manager,
+                db_manager=db_manager,
+                batch_number=batch_number,
+                pp_batch=pp_batch,
+                paycode_cache=paycode_cache
+            )
+        
+        # Track failures for recovery logic
+        if not success:
+            consecutive_failures += 1
+            logger.warning(f"Consecutive failures: {consecutive_failures}/{MAX_CONSECUTIVE_FAILURES}")
+            
+            # If we hit max consecutive failures, try full recovery
+            if consecutive_failures >= MAX_CONSECUTIVE_FAILURES:
+                logger.error(f"Hit {MAX_CONSECUTIVE_FAILURES} consecutive failures - attempting full recovery")
+                send_error_notification(
+                    f"Worker {worker_id}: attempting recovery after {consecutive_failures} consecutive failures")
+                
+                if recover_from_fatal_error(
+                    driver=driver,
+                    settings_page=settings_page,
+                    navigator=navigator,
+                    pp_batch=pp_batch,
+                    login_page=login,
+                    group=group,
+                    username=username,
+                    password=password
+                ):
+                    # Recovery successful - update batch number and reset counter
+                    batch_number = pp_batch.batch_number
+                    logger.info(f"Recovery successful - continuing with batch: {batch_number}")
+                    consecutive_failures = 0
+                else:
+                    # Recovery failed - send notification and stop this work item
+                    logger.critical("Recovery failed - stopping processing for this group")
+                    send_error_notification(f"FATAL ERROR: Worker {worker_id} recovery failed after multiple attempts")
+                    break
+        else:
+            # Reset counter on success
+            consecutive_failures = 0
+    
+    # A failed rejection may have reopened or left the batch; only keep it after a success
+    navigator.batch_opened(pp_batch.batch_number if consecutive_failures == 0 else None)
+
+
+def run_worker(
+    worker_id: int,
+    work_queue: "queue.Queue[Optional[WorkItem]]",
+    log_folder_path: Path,
+    db_manager: DBManager,
+    username: str,
+    password: str,
+    paycode_cache: Optional[PaycodeCache] = None,
+    command_accountant: Optional[CommandAccountant] = None
+) -> None:
+    """Run one posting worker: its own Chrome session, login and page objects.
+    
+    The worker takes work items from the queue until it receives ``None``.
+    Logs and screenshots go to a ``worker_<n>`` folder under the run's log folder.
+    
+    Args:
+        worker_id: Worker number (1-based)
+        work_queue: Shared queue of work items; ``None`` tells the worker to stop
+        log_folder_path: The run's log folder
+        db_manager: Shared database manager
+        username: IDX username
+        password: IDX password
+        paycode_cache: Shared cache of resolved paycodes
+        command_accountant: Shared WebDriver command accounting
+    """
+    worker_log_path = log_folder_path / f"worker_{worker_id}"
+    worker_log_path.mkdir(parents=True, exist_ok=True)
+    sink_id = add_worker_log_sink(worker_log_path, worker_id)
+    
+    with logger.contextualize(worker=worker_id):
+        driver = None
+        settings_page = None
+        try:
+            driver = create_chrome_driver(worker_id, command_accountant)
+            screenshot_manager = ScreenshotManager(driver, str(worker_log_path))
+            
+            # Login
+            login = LoginPage(driver, screenshot_manager)
+            login.navigate_to_login()
+            if not login.login(username, password):
+                logger.error(f"Worker {worker_id} login failed, worker exiting.")
+                return
+            ModalWatcher(driver).install()
+            
+            # Initialize page objects
+            settings_page = SettingsPage(driver)
+            navigator = Navigator(driver, settings_page, VTBPage(driver))
+            pp_batch = PaymentPostingBatch(driver)
+            
+            while True:
+                item = work_queue.get()
+                if item is None:
+                    work_queue.task_done()
+                    break
+                try:
+                    post_work_item(
+                        item=item,
+                        worker_id=worker_id,
+                        driver=driver,
+                        screenshot_manager=screenshot_manager,
+                        db_manager=db_manager,
+                        login=login,
+                        settings_page=settings_page,
+                        navigator=navigator,
+                        pp_batch=pp_batch,
+                        username=username,
+                        password=password,
+                        paycode_cache=paycode_cache
+                    )
+                except Exception as e:
+                    logger.exception(f"Worker {worker_id} failed on group {item.group} of {', '.join(item.file_names)}: {e}")
+                    # The session may be anywhere now; re-check it before the next item
+                    navigator.reset()
+                    screenshot_manager.capture_error_screenshot(f"worker_{worker_id}_group_{item.group}", e)
+                finally:
+                    work_queue.task_done()
+        
+        except Exception as e:
+            logger.exception(f"Worker {worker_id} crashed: {e}")
+            send_error_notification(f"Worker {worker_id} crashed: {e}")
+        
+        finally:
+            # Cleanup
+            if driver is not None:
+                try:
+                    if settings_page is not None:
+                        settings_page.logout()
+                        time.sleep(5)
+                except Exception as e:
+                    logger.warning(f"Worker {worker_id} logout failed: {e}")
+                driver.quit()
+            logger.remove(sink_id)
+
+
+def wait_for_work_queue(work_queue: "queue.Queue[Optional[WorkItem]]", workers: List[threading.Thread]) -> bool:
+    """Block until every queued work item is done, or no worker is left to do it.
+    
+    Args:
+        work_queue: Shared queue of work items
+        workers: Worker threads consuming the queue
+        
+    Returns:
+        True if the queue drained, False if all workers exited first
+    """
+    while work_queue.unfinished_tasks:
+        if not any(worker.is_alive() for worker in workers):
+            logger.error(f"All workers have exited with {work_queue.unfinished_tasks} work items left.")
+            return False
+        time.sleep(WORKER_POLL_INTERVAL)
+    return True
+
+
+def process_files(
+    file_paths: List[str],
+    db_manager: DBManager,
+    work_queue: "queue.Queue[Optional[WorkItem]]",
+    worker_threads: List[threading.Thread],
+    workers: int,
+    staging: Optional[StagingArea] = None,
+    archiver: Optional[ArchiveMover] = None
+) -> bool:
+    """Post the pending work of several input files group by group, then archive the complete files.
+    
+    Work from every file is merged by group (see ``build_work_items``), so each
+    group is changed to and gets a batch once, not once per file. Completion is
+    still checked per file before archiving.
+    
+    Args:
+        file_paths: Paths of the input files on the share
+        db_manager: Shared database manager
+        work_queue: Shared queue of work items
+        worker_threads: Worker threads consuming the queue
+        workers: Number of workers in the pool
+        staging: If given, files are read from their local staged copies
+        archiver: If given, archiving is queued on it
+        
+    Returns:
+        False if all workers exited before the files were finished, True otherwise
+    """
+    input_files: Dict[str, InputFile] = {}
+    for file_path in file_paths:
+        logger.info(f"Using input file: {file_path}")
+        local_path = staging.stage(file_path) if staging else file_path
+        # Parses and stores the file only if it changed since its last ingest
+        input_files[file_path] = InputFile(local_path, db_manager)
+    
+    # Hand each group (or shards of large groups) to idle workers
+    file_group_data = {input_file.file_name: input_file.group_data for input_file in input_files.values()}
+    for item in build_work_items(file_group_data, workers):
+        work_queue.put(item)
+    
+    if not wait_for_work_queue(work_queue, worker_threads):
+        send_error_notification("FATAL ERROR: all posting workers exited before finishing")
+        return False
+    
+    # Archive each file whose groups have all been fully processed
+    for file_path, input_file in input_files.items():
+        archive_file_if_complete(
+            file_path=file_path,
+            file_name=os.path.basename(file_path),
+            groups=list(input_file.group_data.keys()),
+            db_manager=db_manager,
+            archiver=archiver
+        )
+    return True
+
+
+def _file_signature(file_path: str) -> Optional[tuple]:
+    """Return (size, mtime) of a file from the last folder listing, or None if it is gone."""
+    if file_path in INPUT_DISCOVERY.signatures:
+        return INPUT_DISCOVERY.signatures[file_path]
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime
+
+
+def watch_input_folder(
+    processed: Dict[str, tuple],
+    db_manager: DBManager,
+    work_queue: "queue.Queue[Optional[WorkItem]]",
+    worker_threads: List[threading.Thread],
+    workers: int,
+    poll_interval: float = WATCH_POLL_SECONDS,
+    staging: Optional[StagingArea] = None,
+    archiver: Optional[ArchiveMover] = None
+) -> None:
+    """Keep the logged-in workers and post input files as they arrive, until Ctrl+C.
+    
+    A file is posted once its size and mtime are unchanged between two polls (so a
+    copy in progress is not read half-written), and again only if it changes.
+    
+    Args:
+        processed: Signatures of files already posted, updated in place
+        db_manager: Shared database manager
+        work_queue: Shared queue of work items
+        worker_threads: Worker threads consuming the queue
+        workers: Number of workers in the pool
+        poll_interval: Seconds between checks of the input folder
+        staging: If given, files are read from local staged copies
+        archiver: If given, archiving is queued on it and flushed after each batch of files
+    """
+    logger.info(f"Watching {INPUT_FILE_PATH} for new files every {poll_interval}s (Ctrl+C to stop)")
+    last_seen: Dict[str, tuple] = {}
+    try:
+        while True:
+            time.sleep(poll_interval)
+            current = {}
+            for file_path in get_files_to_process():
+                signature = _file_signature(file_path)
+                if signature is not None:
+                    current[file_path] = signature
+            
+            ready = [
+                file_path for file_path, signature in current.items()
+                if last_seen.get(file_path) == signature and processed.get(file_path) != signature
+            ]
+            last_seen = current
+            if not ready:
+                continue
+            
+            logger.info(f"New input files: {ready}")
+            ingest_files([staging.stage(f) if staging else f for f in ready], db_manager)
+            for file_path in ready:
+                processed[file_path] = current[file_path]
+            if not process_files(ready, db_manager, work_queue, worker_threads, workers, staging, archiver):
+                return
+            if archiver is not None:
+                archiver.flush()
+    except KeyboardInterrupt:
+        logger.info("Watch mode stopped")
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Post payment rejections to IDX.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("WORKERS", DEFAULT_WORKERS)),
+        help="Number of parallel Chrome sessions (default: WORKERS env var or 1)"
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Stay logged in and post new input files as they arrive, until Ctrl+C"
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=float(os.getenv("WATCH_POLL_SECONDS", WATCH_POLL_SECONDS)),
+        help="Seconds between input folder checks in watch mode (default: WATCH_POLL_SECONDS env var or 10)"
+    )
+    return parser.parse_args()
+
+
+def main(workers: int = DEFAULT_WORKERS, watch: bool = False, poll_interval: float = WATCH_POLL_SECONDS) -> None:
+    """Main entry point for the rejection processing script.
+    
+    Args:
+        workers: Number of parallel logged-in Chrome sessions
+        watch: Keep running and post new input files as they arrive
+        poll_interval: Seconds between input folder checks in watch mode
+    """
     load_dotenv()
     
     # Setup logging
     log_folder_path = get_log_folder_path()
     setup_logging(log_folder_path)
+    configure_tracing(log_folder_path)
     
     # Clean up old logs
     try:
@@ -426,19 +934,10 @@ def main() -> None:
     
     # Find files to process
     files_to_process = get_files_to_process()
-    if not files_to_process:
+    if not files_to_process and not watch:
         send_error_notification("No files to process.")
         return
     
-    # Initialize WebDriver and managers
-    driver = create_chrome_driver()
-    screenshot_manager = ScreenshotManager(driver, str(log_folder_path))
-    db_manager = DBManager()
-    
-    # Login
-    login = LoginPage(driver, screenshot_manager)
-    login.navigate_to_login()
-    
     username = os.getenv("IDX_USERNAME")
     password = os.getenv("IDX_PASSWORD")
     if not username or not password:
@@ -446,109 +945,83 @@ def main() -> None:
         send_error_notification("Missing login credentials")
         return
     
-    if not login.login(username, password):
-        logger.error("Login failed, terminating script.")
-        return
-    
-    # Initialize page objects
-    settings_page = SettingsPage(driver)
-    vtb = VTBPage(driver)
-    pp_batch = PaymentPostingBatch(driver)
-    pic_screen = PICScreen_Main(driver)
+    write_behind = os.getenv("DB_WRITE_BEHIND", "1").strip().lower() not in ("0", "false", "no")
+    db_manager = DBManager(write_behind=write_behind)
+    db_manager.create_db_and_tables()
+    paycode_cache = PaycodeCache(db_manager)
+    command_accountant = CommandAccountant()
+    staging = StagingArea()
+    archiver = ArchiveMover(staging)
     
-    # Track consecutive failures for recovery logic
-    consecutive_failures = 0
-    max_consecutive_failures = 3
+    # Start the worker pool; each worker logs in with its own Chrome session
+    workers = max(1, workers)
+    logger.info(f"Starting {workers} posting worker(s)")
+    work_queue: "queue.Queue[Optional[WorkItem]]" = queue.Queue()
+    worker_threads = [
+        threading.Thread(
+            target=run_worker,
+            args=(
+                worker_id, work_queue, log_folder_path, db_manager,
+                username, password, paycode_cache, command_accountant
+            ),
+            name=f"worker-{worker_id}",
+            daemon=True
+        )
+        for worker_id in range(1, workers + 1)
+    ]
+    for worker in worker_threads:
+        worker.start()
     
     try:
-        # Process each file
-        for file_path in tqdm(files_to_process, desc="Processing input files"):
-            logger.info(f"Using input file: {file_path}")
-            
-            input_file = InputFile(file_path, db_manager)
-            input_file.load_data()
-            
-            # Process each group in the file
-            for group, group_data in tqdm(input_file.group_data.items(), desc="Processing groups"):
-                if not group_data:
-                    logger.info(f"No data for group {group}, skipping.")
-                    continue
-                
-                # Ensure correct group and VTB selection
-                if pic_screen.get_current_batch_group() != group:
-                    settings_page.change_group(group)
-                
-                if not vtb.validate_current_selection("Payment Posting"):
-                    vtb.select_vtb_option("Payment Posting")
-                
-                # Open batch
-                pp_batch.open_batch()
-                batch_number = pp_batch.batch_number
-                logger.info(f"Processing group {group} with batch number: {batch_number}")
-                time.sleep(BATCH_OPEN_RETRY_SLEEP)
-                
-                # Process each rejection in the group
-                for rejection in tqdm(group_data, total=len(group_data), desc=f"Processing group {group}"):
-                    success = process_rejection(
-                        rejection=rejection,
-                        driver=driver,
-                        screenshot_manager=screenshot_manager,
-                        db_manager=db_manager,
-                        batch_number=batch_number,
-                        pp_batch=pp_batch
-                    )
-                    
-                    # Track failures for recovery logic
-                    if not success:
-                        consecutive_failures += 1
-                        logger.warning(f"Consecutive failures: {consecutive_failures}/{max_consecutive_failures}")
-                        
-                        # If we hit max consecutive failures, try full recovery
-                        if consecutive_failures >= max_consecutive_failures:
-                            logger.error(f"Hit {max_consecutive_failures} consecutive failures - attempting full recovery")
-                            send_error_notification(f"Attempting recovery after {consecutive_failures} consecutive failures")
-                            
-                            if recover_from_fatal_error(
-                                driver=driver,
-                                settings_page=settings_page,
-                                vtb=vtb,
-                                pp_batch=pp_batch,
-                                login_page=login,
-                                group=group,
-                                username=username,
-                                password=password
-                            ):
-                                # Recovery successful - update batch number and reset counter
-                                batch_number = pp_batch.batch_number
-                                logger.info(f"Recovery successful - continuing with batch: {batch_number}")
-                                consecutive_failures = 0
-                            else:
-                                # Recovery failed - send notification and break
-                                logger.critical("Recovery failed - stopping processing for this group")
-                                send_error_notification("FATAL ERROR: Recovery failed after multiple attempts")
-                                break
-                    else:
-                        # Reset counter on success
-                        consecutive_failures = 0
-            
-            # Archive file if all groups have been fully processed
-            archive_file_if_complete(
-                file_path=file_path,
-                file_name=os.path.basename(file_path),
-                groups=list(input_file.group_data.keys()),
-                db_manager=db_manager
+        # Copy files to local disk, then parse every new or changed one while the workers log in
+        ingest_files([staging.stage(file_path) for file_path in files_to_process], db_manager)
+        
+        # Post all files' work group by group
+        processed: Dict[str, tuple] = {
+            file_path: _file_signature(file_path) or () for file_path in files_to_process
+        }
+        workers_alive = process_files(
+            files_to_process, db_manager, work_queue, worker_threads, workers, staging, archiver
+        )
+        archiver.flush()
+        
+        if watch and workers_alive:
+            watch_input_folder(
+                processed, db_manager, work_queue, worker_threads, workers, poll_interval, staging, archiver
             )
     
     finally:
-        # Cleanup
-        settings_page.logout()
-        time.sleep(5)
-        driver.quit()
+        # Drop work not started yet (e.g. after Ctrl+C) so workers stop right away
+        while True:
+            try:
+                work_queue.get_nowait()
+            except queue.Empty:
+                break
+            work_queue.task_done()
+        
+        # Stop workers; each logs out and quits its own driver
+        for _ in worker_threads:
+            work_queue.put(None)
+        for worker in worker_threads:
+            worker.join()
+        
+        # Commit any queued row updates before reporting
+        db_manager.close()
+        archiver.close()
+        command_accountant.write_report(log_folder_path)
+        close_tracing()
+        
+        cache_stats = paycode_cache.stats()
+        logger.info(
+            f"Paycode cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+            f"{cache_stats['invalidations']} invalidations ({cache_stats['hit_rate']:.0%} hit rate)"
+        )
 
 
 if __name__ == "__main__":
     try:
-        main()
+        args = parse_args()
+        main(workers=args.workers, watch=args.watch, poll_interval=args.poll_interval)
     except Exception as e:
         logger.exception("Fatal error in main")
-        send_error_notification(str(e))
\ No newline at end of file
+        send_error_notification(str(e))
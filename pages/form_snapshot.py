@@ -0,0 +1,180 @@
+from typing import Callable, Dict, List, Optional
+
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import WebDriverException
+
+from utils.waits import DEFAULT_TIMEOUT, wait_until
+
+
+class FormSnapshot:
+    """State of the whole IDX form, read in a single script call.
+
+    Holds the value, checked and disabled state of every ``sAf*``/``sBf*`` input,
+    the displayed value of every ``rcm-select`` dropdown (keyed by the id of its
+    closest ``sA*``/``sB*`` ancestor), the form header text, the selected tab
+    labels and any open overlay dialogs. Page objects assert against a snapshot
+    instead of polling single elements.
+    """
+    SCRIPT = """
+    var fields = {};
+    document.querySelectorAll('input[id^="sAf"], input[id^="sBf"], textarea[id^="sAf"], textarea[id^="sBf"]')
+        .forEach(function (el) {
+            fields[el.id] = {value: el.value, checked: el.checked, disabled: el.disabled};
+        });
+    var selects = {};
+    document.querySelectorAll('div.rcm-select__single-value').forEach(function (el) {
+        var owner = el.closest('[id^="sA"], [id^="sB"]');
+        if (owner && !(owner.id in selects)) { selects[owner.id] = el.innerText.trim(); }
+    });
+    var tabs = [];
+    document.querySelectorAll('button.fe_c_tabs__label.fe_is-selected').forEach(function (el) {
+        tabs.push(el.innerText.trim());
+    });
+    var overlays = [];
+    document.querySelectorAll('div.fe_c_overlay__dialog').forEach(function (el) {
+        if (el.getClientRects().length) { overlays.push({classes: el.className, text: el.innerText}); }
+    });
+    var header = document.getElementById('formHeader');
+    return {
+        fields: fields,
+        selects: selects,
+        tabs: tabs,
+        overlays: overlays,
+        header: header ? header.innerText : null
+    };
+    """
+
+    # Single-field reads for waits that only need one value
+    FIELD_SCRIPT = """
+    var el = document.getElementById(arguments[0]);
+    return el ? el.value : null;
+    """
+    HEADER_SCRIPT = """
+    var el = document.getElementById('formHeader');
+    return el ? el.innerText : null;
+    """
+
+    def __init__(self, data: dict):
+        self.fields: Dict[str, dict] = data.get('fields', {})
+        self.selects: Dict[str, str] = data.get('selects', {})
+        self.tabs: List[str] = data.get('tabs', [])
+        self.overlays: List[dict] = data.get('overlays', [])
+        self.header: Optional[str] = data.get('header')
+
+    @classmethod
+    def take(cls, driver: webdriver.Chrome) -> "FormSnapshot":
+        """Read the current form state in one WebDriver round trip."""
+        try:
+            return cls(driver.execute_script(cls.SCRIPT) or {})
+        except WebDriverException:
+            # Page is mid-navigation; report an empty form
+            return cls({})
+
+    @classmethod
+    def wait_for(
+        cls,
+        driver: webdriver.Chrome,
+        predicate: Callable[["FormSnapshot"], bool],
+        timeout: float = DEFAULT_TIMEOUT,
+        description: str = "form state"
+    ) -> Optional["FormSnapshot"]:
+        """Take snapshots until ``predicate`` holds.
+
+        Returns:
+            The first snapshot satisfying the predicate, or None on timeout
+        """
+        def satisfied(d):
+            snapshot = cls.take(d)
+            return snapshot if predicate(snapshot) else False
+        return wait_until(driver, satisfied, timeout, description) or None
+
+    @staticmethod
+    def _wait_for_script(
+        driver: webdriver.Chrome,
+        script: str,
+        args: tuple,
+        predicate: Callable[[Optional[str]], bool],
+        timeout: float,
+        description: str
+    ) -> Optional[str]:
+        def satisfied(d):
+            try:
+                value = d.execute_script(script, *args)
+            except WebDriverException:
+                return False
+            # Wrapped so that an empty string still ends the wait
+            return [value] if predicate(value) else False
+        result = wait_until(driver, satisfied, timeout, description)
+        return result[0] if result else None
+
+    @classmethod
+    def wait_for_field(
+        cls,
+        driver: webdriver.Chrome,
+        field_id: str,
+        predicate: Optional[Callable[[str], bool]] = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        description: Optional[str] = None
+    ) -> Optional[str]:
+        """Poll one field's value until it is present and ``predicate`` holds.
+
+        Cheaper than ``wait_for`` when only a single field matters.
+
+        Returns:
+            The field's value, or None on timeout
+        """
+        return cls._wait_for_script(
+            driver,
+            cls.FIELD_SCRIPT,
+            (field_id,),
+            lambda value: value is not None and (predicate is None or predicate(value)),
+            timeout,
+            description or f"field {field_id}"
+        )
+
+    @classmethod
+    def wait_for_header(cls, driver: webdriver.Chrome, timeout: float = DEFAULT_TIMEOUT) -> Optional[str]:
+        """Poll the form header until it is present.
+
+        Returns:
+            The header text, or None on timeout
+        """
+        return cls._wait_for_script(
+            driver, cls.HEADER_SCRIPT, (), lambda value: value is not None, timeout, "form header"
+        )
+
+    @staticmethod
+    def field_id(locator: tuple) -> str:
+        """Return the element id of a ``(By.ID, ...)`` locator."""
+        if locator[0] != By.ID:
+            raise ValueError(f"FormSnapshot fields are keyed by id, got locator {locator}")
+        return locator[1]
+
+    def has(self, field_id: str) -> bool:
+        return field_id in self.fields
+
+    def value(self, field_id: str, default: Optional[str] = None) -> Optional[str]:
+        return self.fields.get(field_id, {}).get('value', default)
+
+    def checked(self, field_id: str) -> bool:
+        return bool(self.fields.get(field_id, {}).get('checked'))
+
+    def disabled(self, field_id: str) -> bool:
+        return bool(self.fields.get(field_id, {}).get('disabled'))
+
+    def select(self, owner_id: str) -> str:
+        return self.selects.get(owner_id, '')
+
+    def mismatches(self, expected: Dict[str, Optional[str]]) -> List[str]:
+        """Return the ids whose value differs from ``expected``.
+
+        An expected value of None means the field only has to be non-empty.
+        """
+        failed = []
+        for field_id, expected_value in expected.items():
+            actual = self.value(field_id)
+            if actual is None or (expected_value is None and actual == '') or \
+                    (expected_value is not None and actual != expected_value):
+                failed.append(field_id)
+        return failed
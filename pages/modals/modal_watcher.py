@@ -0,0 +1,102 @@
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from loguru import logger
+
+from utils.waits import is_idle, page_time, wait_until
+
+
+class ModalWatcher:
+    """Tracks IDX modals and lightboxes with a MutationObserver injected into the page.
+
+    The observer is installed once per page load (any call re-installs it after a
+    navigation) and records every dialog that appears, with its text and a timestamp,
+    in a JS-side queue. Checking for a modal is then a single script call.
+    """
+    DIALOG_SELECTOR = 'div.fe_c_modal__dialog, div.fe_c_lightbox__dialog'
+    MAX_EVENTS = 50
+
+    _SCRIPT = """
+    var selector = arguments[0], drain = arguments[1], maxEvents = arguments[2];
+    var kindOf = function (el) {
+        return el.classList.contains('fe_c_lightbox__dialog') ? 'lightbox' : 'modal';
+    };
+    var watcher = window.__rcmModalWatcher;
+    if (!watcher) {
+        watcher = window.__rcmModalWatcher = {queue: []};
+        var record = function (el) {
+            watcher.queue.push({el: el, kind: kindOf(el), text: el.innerText, time: Date.now()});
+            if (watcher.queue.length > maxEvents) { watcher.queue.shift(); }
+        };
+        var scan = function (node) {
+            if (node.nodeType !== 1) { return; }
+            if (node.matches(selector)) { record(node); }
+            node.querySelectorAll(selector).forEach(record);
+        };
+        new MutationObserver(function (mutations) {
+            mutations.forEach(function (m) { m.addedNodes.forEach(scan); });
+        }).observe(document.documentElement, {childList: true, subtree: true});
+        scan(document.documentElement);
+    }
+
+    var visible = [];
+    document.querySelectorAll(selector).forEach(function (el) {
+        if (el.getClientRects().length) {
+            visible.push({kind: kindOf(el), text: el.innerText, classes: el.className});
+        }
+    });
+    var events = drain ? watcher.queue.splice(0).map(function (e) {
+        return {kind: e.kind, text: e.el.isConnected ? e.el.innerText : e.text, time: e.time};
+    }) : [];
+    return {open: visible, events: events};
+    """
+
+    def __init__(self, driver: webdriver.Chrome):
+        self.driver = driver
+
+    def check(self, drain: bool = False) -> dict:
+        """Return the currently open dialogs and, if ``drain`` is set, the queued appearance events.
+
+        Installs the observer if the page does not have it yet.
+        """
+        try:
+            state = self.driver.execute_script(self._SCRIPT, self.DIALOG_SELECTOR, drain, self.MAX_EVENTS)
+        except WebDriverException as e:
+            logger.debug(f"Modal watcher check failed: {e}")
+            return {'open': [], 'events': []}
+        for event in state['events']:
+            logger.debug(f"Modal watcher saw {event['kind']} at {event['time']}: {event['text']!r}")
+        return state
+
+    def install(self) -> None:
+        """Inject the observer into the current page."""
+        self.check()
+
+    def find_open(self, classes: str = '', contains: str = '') -> dict | None:
+        """Return the first open dialog that has all of ``classes`` and whose text includes ``contains``."""
+        required = set(classes.split())
+        for dialog in self.check(drain=True)['open']:
+            if required <= set(dialog['classes'].split()) and contains in dialog['text']:
+                return dialog
+        return None
+
+    def wait_for_open(self, classes: str = '', contains: str = '', timeout: float = 2) -> dict | None:
+        """Wait for a matching dialog raised by the last action.
+
+        Returns as soon as a matching dialog is open, or once the page has been idle
+        (no request in flight, no DOM mutation) for the quiet period measured from
+        this call. An action's request may not have started when this is first
+        called, so a page that was already quiet does not count as "no modal".
+        """
+        found = {}
+        start = page_time(self.driver)
+
+        def settled(driver):
+            dialog = self.find_open(classes, contains)
+            if dialog:
+                found['dialog'] = dialog
+                return True
+            return is_idle(driver, since=start)
+
+        wait_until(self.driver, settled, timeout, "modal or idle page")
+        # The page may have gone idle in the same poll the dialog rendered
+        return found.get('dialog') or self.find_open(classes, contains)
@@ -5,7 +5,8 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 from loguru import logger
-import time
+
+from utils.waits import wait_for_idle, wait_until
 
 class PaymentCodesModal:
     MODAL_LOCATOR = (By.CSS_SELECTOR, 'div.fe_c_overlay__dialog.fe_c_lightbox__dialog.fe_c_lightbox__dialog--medium')
@@ -32,11 +33,18 @@ class PaymentCodesModal:
     def close_modal(self):
         if self.confirm_modal_open():
             self.driver.find_element(*self.CANCEL_BTN_LOCATOR).click()
-            self.driver.implicitly_wait(1)
+            WebDriverWait(self.driver, 5).until(EC.invisibility_of_element_located(self.MODAL_LOCATOR))
             logger.debug("Payment Codes modal has been closed.")
     
     def get_paycode_options(self) -> str | None:
-        time.sleep(2)
+        wait_until(
+            self.driver,
+            lambda d: d.find_elements(*self.OPTIONS_ROW_LOCATOR),
+            description="payment code options to load"
+        )
+        # The grid renders its rows over several frames after the first cell appears;
+        # read them once the network is idle and the DOM has stopped changing
+        wait_for_idle(self.driver)
         options = self.driver.find_elements(*self.OPTIONS_ROW_LOCATOR)
         
         option_names = [option for option in options if option.get_attribute('col-id') == 'col1']
@@ -51,7 +59,6 @@ class PaymentCodesModal:
             if 'MANUAL' in name.text.upper():
                 available_options.add(code.text)
         
-        time.sleep(1)
         self.close_modal()
         available_options = list(available_options)
         
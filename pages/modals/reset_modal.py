@@ -1,38 +1,38 @@
-import time
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
 from loguru import logger
 
+from pages.modals.modal_watcher import ModalWatcher
 from utils.screenshot import ScreenshotManager
 
 class ResetModal:
-    MODAL_INDICATOR = (By.CSS_SELECTOR, "div.fe_c_overlay__dialog.fe_c_modal__dialog.fe_c_modal__dialog--large.fe_c_modal__dialog--padded.fe_is-info")
+    MODAL_CLASSES = "fe_c_overlay__dialog fe_c_modal__dialog fe_c_modal__dialog--large fe_c_modal__dialog--padded fe_is-info"
+    MODAL_INDICATOR = (By.CSS_SELECTOR, "div." + MODAL_CLASSES.replace(" ", "."))
     MODAL_CLOSE = (By.ID, "modalButtonOk")
 
     def __init__(self, driver, screenshot_manager: ScreenshotManager | None):
         self.driver = driver
         self.screenshot_manager = screenshot_manager
+        self.watcher = ModalWatcher(driver)
 
     def close_if_present(self, timeout=2) -> str | None:
-        time.sleep(0.5)
-        try:
-            modal = WebDriverWait(self.driver, timeout).until(
-                EC.presence_of_element_located(self.MODAL_INDICATOR)
+        # A modal raised by the last action arrives with its response; wait until it
+        # shows or the page goes idle without it
+        modal = self.watcher.wait_for_open(self.MODAL_CLASSES, timeout=timeout)
+        if not modal or not modal['text']:
+            return None
+        
+        modal_text = modal['text']
+        if self.screenshot_manager:
+            self.screenshot_manager.capture_error_screenshot(
+                "reset_modal_detected",
+                Exception("Reset modal detected: " + modal_text)
             )
-            modal_text = modal.text
-            if modal_text:
-                if self.screenshot_manager:
-                    self.screenshot_manager.capture_error_screenshot(
-                        "reset_modal_detected",
-                        Exception("Reset modal detected: " + modal_text)
-                    )
-                WebDriverWait(self.driver, timeout).until(
-                    EC.element_to_be_clickable(self.MODAL_CLOSE)
-                )
-                self.driver.find_element(*self.MODAL_CLOSE).click()
-                logger.debug("Reset modal detected and closed.")
-                return modal_text.split("\n")[1]
-        except TimeoutException:
-            return
\ No newline at end of file
+        WebDriverWait(self.driver, timeout).until(
+            EC.element_to_be_clickable(self.MODAL_CLOSE)
+        )
+        self.driver.find_element(*self.MODAL_CLOSE).click()
+        logger.debug("Reset modal detected and closed.")
+        lines = modal_text.split("\n")
+        return lines[1] if len(lines) > 1 else lines[0]
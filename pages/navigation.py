@@ -0,0 +1,124 @@
+from dataclasses import dataclass
+from typing import Optional
+import re
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from loguru import logger
+
+from pages.open_settings import SettingsPage
+from pages.open_vtb import VTBPage
+
+
+@dataclass
+class NavigationState:
+    """Where a worker's IDX session is: screen, group, VTB option and open batch.
+
+    None means unknown (e.g. right after login or recovery).
+    """
+    screen: Optional[str] = None
+    group: Optional[int] = None
+    vtb_option: Optional[str] = None
+    batch_number: Optional[str] = None
+
+
+class Navigator:
+    """Tracks the navigation state of one session and only navigates when it differs.
+
+    The state is updated on every transition made through the navigator and checked
+    against the page with a single script call (form header and selected VTB item),
+    so asking for the group and VTB option the session is already on costs one
+    round trip instead of opening the settings screen or the VTB panel, and a batch
+    still open on the Post Receipts screen for the same group is reused.
+    """
+    PROBE_SCRIPT = """
+    var header = document.getElementById('formHeader');
+    var selected = document.querySelector('.vtb-container .vtb-item.selected');
+    return {
+        header: header ? header.innerText : null,
+        vtb: selected ? selected.textContent.trim() : null
+    };
+    """
+    GROUP_PATTERN = re.compile(r'Grp:(\d+)')
+
+    def __init__(self, driver: webdriver.Chrome, settings_page: SettingsPage, vtb: VTBPage):
+        self.driver = driver
+        self.settings_page = settings_page
+        self.vtb = vtb
+        self.state = NavigationState()
+
+    def reset(self) -> None:
+        """Forget the tracked state, e.g. after logging in again."""
+        self.state = NavigationState()
+
+    def _probe(self) -> dict:
+        try:
+            page = self.driver.execute_script(self.PROBE_SCRIPT) or {}
+        except WebDriverException as e:
+            logger.debug(f"Navigation probe failed: {e}")
+            return {'header': None, 'group': None, 'vtb': None}
+        header = page.get('header') or ''
+        match = self.GROUP_PATTERN.search(header)
+        return {
+            'header': header,
+            'group': int(match.group(1)) if match else None,
+            'vtb': page.get('vtb') or None,
+        }
+
+    def ensure(self, group: int, vtb_option: str = "Payment Posting") -> bool:
+        """Make sure the session is on ``group`` and ``vtb_option``, navigating only if needed.
+
+        Returns:
+            True if any navigation was done
+        """
+        page = self._probe()
+        navigated = False
+
+        # The page wins over the tracked state when it shows the value
+        current_group = page['group'] if page['group'] is not None else self.state.group
+        if current_group != group:
+            logger.info(f"Changing group {current_group} -> {group}")
+            self.settings_page.change_group(group)
+            self.state = NavigationState(screen="home", group=group)
+            page = self._probe()
+            navigated = True
+        else:
+            if self.state.group != group:
+                # The tracked batch, if any, belongs to another group
+                self.state.batch_number = None
+            self.state.group = group
+
+        current_option = page['vtb'] if page['vtb'] is not None else self.state.vtb_option
+        if current_option != vtb_option:
+            logger.info(f"Selecting VTB option {vtb_option}")
+            self.vtb.select_vtb_option(vtb_option)
+            # select_vtb_option confirms the Post Receipts header; no batch is open yet
+            navigated = True
+            self.state.batch_number = None
+        self.state.vtb_option = vtb_option
+        if navigated or "Post Receipts" in (page['header'] or ''):
+            self.state.screen = "post_receipts"
+        else:
+            # Left the Post Receipts screen, so the tracked batch no longer applies
+            self.state.screen = None
+            self.state.batch_number = None
+
+        if not navigated:
+            logger.debug(f"Already on group {group} / {vtb_option}, no navigation needed")
+        return navigated
+
+    def batch_opened(self, batch_number: Optional[str]) -> None:
+        """Record the batch that was just opened, or None if no batch is known to be open."""
+        self.state.batch_number = batch_number or None
+        if batch_number:
+            self.state.screen = "post_receipts"
+
+    def open_batch_for(self, group: int) -> Optional[str]:
+        """Return the tracked batch if it is still open for ``group``; call after ``ensure``.
+
+        Returns:
+            The batch number, or None if a batch has to be opened
+        """
+        if self.state.screen == "post_receipts" and self.state.group == group:
+            return self.state.batch_number
+        return None
@@ -4,14 +4,17 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.action_chains import ActionChains
-import time
 from loguru import logger
 
+from utils.tracing import traced
+from utils.waits import wait_for_dom_settled
+
 class SettingsPage:
     MENU_BUTTON = (By.ID, "user_menu_btn-button")
     HOG_SCREEN_LINK = (By.ID, "tools_HOG_1")
     GROUP_SELECTOR = (By.ID, "cboGroup")
     CURRENT_SELECTION = (By.CSS_SELECTOR, "[class^='rcm-select__single-value']")
+    OPTION_XPATH = "//div[contains(@class, 'rcm-select__option') and normalize-space()='{}']"
     OK_BTN = (By.ID, "cmdOK")
     CANCEL_BTN = (By.ID, "cmdCancel")
     LOGOUT_BTN = (By.ID, "user_logout")
@@ -72,6 +75,7 @@ class SettingsPage:
             ActionChains(self.driver).click(cancel_button).perform()
         return self.GROUP_MAP[current_selection]
         
+    @traced("change_group")
     def change_group(self, target_group_number: int):
         if target_group_number not in self.NUMBER_MAP:
             raise ValueError(f"Invalid target group number: {target_group_number}. Must be one of: {list(self.NUMBER_MAP.keys())}")
@@ -82,37 +86,29 @@ class SettingsPage:
             logger.info(f"Group {current_group} is already selected. No action needed.")
             return
         
-        difference = target_group_number - current_group
-        presses = abs(difference)
-   
-        # Define the key to send based on direction
-        if difference > 0:
-            # Target is a higher number, so press Down
-            key_to_send = "\ue015"
-        elif difference < 0:
-            # Target is a lower number, so press Up
-            key_to_send = "\ue013"
-        else:
-            cancel_button = WebDriverWait(self.driver, 10).until(EC.element_to_be_clickable(self.CANCEL_BTN))
-            cancel_button.click()
+        target_text = self.NUMBER_MAP[target_group_number]
 
         WebDriverWait(self.driver, 5).until(
             EC.presence_of_element_located(self.GROUP_SELECTOR))
         group_selector = self.driver.find_element(*self.GROUP_SELECTOR)
         group_selector.click()
-        time.sleep(0.5)
-        
-        # Send the arrow keys to the selector element
-        for _ in range(presses):
-            group_selector.send_keys(key_to_send)
-            time.sleep(0.5)
 
-        # Finally, click to confirm the selection
-        group_selector.send_keys(Keys.ENTER)
-        time.sleep(0.5)
+        # Click the target option directly instead of walking the list with arrow keys
+        option_locator = (By.XPATH, self.OPTION_XPATH.format(target_text))
+        try:
+            WebDriverWait(self.driver, 3).until(
+                EC.element_to_be_clickable(option_locator)
+            ).click()
+        except TimeoutException:
+            logger.debug("Group option not found in the open menu, falling back to arrow keys")
+            difference = target_group_number - current_group
+            # Down for a higher group number, Up for a lower one
+            key_to_send = Keys.ARROW_DOWN if difference > 0 else Keys.ARROW_UP
+            wait_for_dom_settled(self.driver)
+            group_selector.send_keys(key_to_send * abs(difference))
+            wait_for_dom_settled(self.driver)
+            group_selector.send_keys(Keys.ENTER)
 
-        target_text = self.NUMBER_MAP[target_group_number]
-        
         WebDriverWait(self.driver, 5).until(
             EC.text_to_be_present_in_element((By.ID, "cboGroup"), target_text))
         logger.success(f"Successfully changed group to {target_text}.")
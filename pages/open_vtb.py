@@ -1,9 +1,11 @@
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-import time
 from loguru import logger
 
+from pages.form_snapshot import FormSnapshot
+from utils.waits import wait_for_dom_settled
+
 class VTBPage:
     VTB_BUTTON = (By.ID, "vtbToggleButton")
     VTB_CONTAINER = (By.CSS_SELECTOR, "div.vtb-container.open")
@@ -55,10 +57,7 @@ class VTBPage:
         return current_option == desired_option
 
     def confirm_navigation(self):
-        WebDriverWait(self.driver, 10).until(
-            EC.presence_of_element_located(self.HEADER_TEXT)
-        )
-        header_text = self.driver.find_element(*self.HEADER_TEXT).text
+        header_text = FormSnapshot.wait_for_header(self.driver, timeout=10) or ""
         if "Post Receipts" in header_text:
             return 
         else:
@@ -77,7 +76,7 @@ class VTBPage:
             raise ValueError(f"Option '{option_text}' not found in VTB options.")
         
         self.confirm_navigation()
-        time.sleep(1)
+        wait_for_dom_settled(self.driver)
         
         if self.is_vtb_open():
             logger.debug("VTB is still open, closing it now.")
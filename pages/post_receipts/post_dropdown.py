@@ -5,34 +5,38 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.keys import Keys
-import time
 from loguru import logger
 
+from pages.form_snapshot import FormSnapshot
+from utils.waits import wait_until
+
 class PostDropdown:
     # Locates the element that displays the current value (e.g., 'N'), relative to the main container (sBf51r3)
     CURRENT_VALUE_LOCATOR = (By.CSS_SELECTOR, 'div.rcm-select__single-value') 
+    MENU_LOCATOR = (By.CSS_SELECTOR, 'div.rcm-select__menu')
     
     DROPDOWN_OPTIONS = ['', 'Y', 'N', 'R', '?'] 
     
-    def __init__(self, driver, row_div):
+    def __init__(self, driver, row_div, row_id: str | None = None):
         self.driver = driver      
         self.row_div = row_div
+        self.row_id = row_id
 
-    def get_value(self):
+    def get_value(self, snapshot: FormSnapshot | None = None):
+        if self.row_id:
+            snapshot = snapshot or FormSnapshot.take(self.driver)
+            return snapshot.select(self.row_id)
         try:
             value_element = self.row_div.find_element(*self.CURRENT_VALUE_LOCATOR)
             return value_element.text.strip()
         except Exception:
             return ''
 
-    def set_value(self, desired_value):
-        current_value = self.get_value()
-
-        if current_value == desired_value:
-            return
-        
-        current_index = self.DROPDOWN_OPTIONS.index(current_value)
-        desired_index = self.DROPDOWN_OPTIONS.index(desired_value)
+    @classmethod
+    def keys_for(cls, current_value, desired_value):
+        """Keystrokes that move an open dropdown from current_value to desired_value and commit it."""
+        current_index = cls.DROPDOWN_OPTIONS.index(current_value)
+        desired_index = cls.DROPDOWN_OPTIONS.index(desired_value)
 
         steps = desired_index - current_index
         
@@ -44,10 +48,24 @@ class PostDropdown:
             
         keys_to_send.append(Keys.ENTER)
         keys_to_send.append(Keys.TAB)
+        return keys_to_send
+
+    def set_value(self, desired_value):
+        current_value = self.get_value()
+
+        if current_value == desired_value:
+            return
+        
+        keys_to_send = self.keys_for(current_value, desired_value)
         
         dropdown_select = self.row_div.find_element(*self.CURRENT_VALUE_LOCATOR)
         dropdown_select.click()
-        time.sleep(0.5)
+        wait_until(
+            self.driver,
+            lambda d: d.find_elements(*self.MENU_LOCATOR),
+            timeout=2,
+            description="post dropdown menu to open"
+        )
         
         actions = ActionChains(self.driver)
         actions.send_keys(*keys_to_send)
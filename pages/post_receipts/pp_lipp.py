@@ -1,60 +1,102 @@
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.action_chains import ActionChains
 
-import time
 from loguru import logger
-from typing import Tuple
+from typing import List, Tuple
 
 from utils.database import Rejections
+from pages.form_snapshot import FormSnapshot
 from pages.post_receipts.post_dropdown import PostDropdown
 from utils.screenshot import ScreenshotManager
+from utils.waits import wait_for_idle, wait_until
 
 class PP_LIPP:
     APPROVED_FIELD_BASE = 'sBf33r'
     REJECTION_FIELD_BASE = 'sBf25r'
     ROW_BASE = 'sBrg1r'
+    # Status dropdown inside each row; FormSnapshot keys the dropdown's value by this id
+    STATUS_FIELD_BASE = 'sBf51r'
     
     BULK_PMT_FIELD = (By.ID, 'sBf92')
     
     OK_BUTTON = (By.ID, 'OK')
     CANCEL_BUTTON = (By.ID, 'Cancel')
+    
+    # Returns every rendered line-item row with its CPT index value and the
+    # text of its row dropdown button, sorted by row index.
+    RENDERED_ROWS_SCRIPT = """
+    var rows = [];
+    document.querySelectorAll('[id^="sBf8r"]').forEach(function (el) {
+        var match = /^sBf8r(\\d+)$/.exec(el.id);
+        if (!match) { return; }
+        var index = parseInt(match[1], 10);
+        var dropdown = document.getElementById('r' + index + '-button');
+        rows.push({
+            index: index,
+            cpt_index: el.value,
+            dropdown: dropdown ? dropdown.innerText.trim() : null
+        });
+    });
+    rows.sort(function (a, b) { return a.index - b.index; });
+    return rows;
+    """
+    
+    # Returns, for each requested row, whether it is rendered, its status dropdown
+    # value, its rejection code value and the elements needed to edit both.
+    ROW_STATE_SCRIPT = """
+    return arguments[0].map(function (row) {
+        var container = document.getElementById('sBrg1r' + row);
+        var rejection = document.getElementById('sBf25r' + row);
+        var status = container ? container.querySelector('div.rcm-select__single-value') : null;
+        return {
+            row: row,
+            rendered: !!(container && rejection),
+            status: status ? status.innerText.trim() : '',
+            rejection: rejection ? rejection.value : null,
+            status_element: status || (container ? container.querySelector('div.rcm-select__control') : null),
+            rejection_element: rejection
+        };
+    });
+    """
 
     def __init__(self, driver, screenshot_manager: ScreenshotManager | None = None):
         self.driver = driver
         self.screenshot_manager = screenshot_manager
     
-    def num_rows_to_process(self) -> Tuple[int, int]:
-        R1_CPT_INDEX_BASE = 'sBf8r'
-        index=0
-        R1_DROPDOWN_LOCATOR = None
-        R1_CPT_INDEX_LOCATOR = None
-        for i in range (1, 10):
-            R1_CPT_INDEX_LOCATOR = (By.ID, R1_CPT_INDEX_BASE + str(i))
-            try:
-                WebDriverWait(self.driver, 5).until(EC.presence_of_element_located(R1_CPT_INDEX_LOCATOR))
-                index=i
-                break
-            except Exception:
-                continue
+    def get_rendered_rows(self, timeout: float = 5) -> List[dict]:
+        """Return every rendered line-item row in one script call.
         
-        R1_DROPDOWN_LOCATOR = (By.ID, f'r{index}-button')
-        first_row_dropdown = self.driver.find_element(*R1_DROPDOWN_LOCATOR).text
-        first_row_cpt_index = self.driver.find_element(*R1_CPT_INDEX_LOCATOR).get_attribute('value') # type: ignore
+        Args:
+            timeout: Seconds to wait for the first row to render
             
-        min_cpt = int(index)
-        max_cpt = int(first_row_cpt_index) - int(first_row_dropdown) +1
+        Returns:
+            List of dicts with ``index``, ``cpt_index`` and ``dropdown`` keys, sorted by index
+        """
+        return wait_until(
+            self.driver,
+            lambda d: d.execute_script(self.RENDERED_ROWS_SCRIPT),
+            timeout=timeout,
+            description="line item rows to render"
+        ) or []
+    
+    def num_rows_to_process(self) -> Tuple[int, int]:
+        rows = self.get_rendered_rows()
+        if not rows:
+            raise NoSuchElementException("No line item rows rendered on the Line Item Payment Posting screen")
+        
+        first_row = rows[0]
+        logger.debug(f"Rendered line item rows: {[row['index'] for row in rows]}")
+        
+        min_cpt = int(first_row['index'])
+        max_cpt = int(first_row['cpt_index']) - int(first_row['dropdown']) + 1
         return (min_cpt, max_cpt)
         
     def confirm_on_rejection_screen(self):
-        active_buttons = self.driver.find_elements(By.CSS_SELECTOR, "button.fe_c_tabs__label.fe_is-selected")
-        for btn in active_buttons:
-            if btn.text == 'Line Item Payment Posting':
-                return True
-        return False
+        return 'Line Item Payment Posting' in FormSnapshot.take(self.driver).tabs
     
     def _scroll_to_row_by_transform(self, row_number: int) -> bool:
         """
@@ -99,21 +141,23 @@ class PP_LIPP:
             
             self.driver.execute_script(script, row_number)
             
-            # Wait for lazy loading to render new elements
-            import time
-            time.sleep(0.8)  # Increased wait time for lazy loading
-            
-            # Verify the row is now present
-            try:
-                self.driver.find_element(By.ID, f'sBf51r{row_number}')
-                return True
-            except:
-                return False
+            # Wait for lazy loading to render the row
+            return bool(wait_until(
+                self.driver,
+                lambda d: d.find_elements(By.ID, f'{self.STATUS_FIELD_BASE}{row_number}'),
+                timeout=3,
+                description=f"row {row_number} to render"
+            ))
             
         except Exception as e:
             print(f"_scroll_to_row_by_transform failed: {e}")
             return False
     
+    def status_dropdown(self, row_number: int, row_element) -> PostDropdown:
+        # FormSnapshot keys a select by its closest sA*/sB* ancestor, which is the
+        # status field sBf51r<N>, not the row container sBrg1r<N>
+        return PostDropdown(self.driver, row_element, row_id=f'{self.STATUS_FIELD_BASE}{row_number}')
+    
     def populate_row(self, row_number: int, rejection: Rejections):
         rejection_locator = (By.ID, f'{self.REJECTION_FIELD_BASE}{row_number}')
         try:
@@ -123,7 +167,7 @@ class PP_LIPP:
             logger.error(f"Row {row_number} not found even after scrolling. Available rows may be limited.")
             raise NoSuchElementException(f"Unable to locate row {row_number} after multiple scroll attempts")
         
-        dropdown = PostDropdown(self.driver, row_element)
+        dropdown = self.status_dropdown(row_number, row_element)
         dropdown.set_value('R')
             
         try:
@@ -139,9 +183,130 @@ class PP_LIPP:
             if self.screenshot_manager:
                 self.screenshot_manager.capture_error_screenshot(f"Rejection field timeout for row {row_number}")
     
+    def _read_row_states(self, row_numbers: List[int]) -> List[dict]:
+        """Read the status, rejection code and edit elements of several rows in one script call."""
+        return self.driver.execute_script(self.ROW_STATE_SCRIPT, row_numbers)
+    
+    @staticmethod
+    def _same_code(value: str | None, rejection_code: str) -> bool:
+        # The field may echo the code with padding or in a different case
+        return (value or '').strip().upper() == (rejection_code or '').strip().upper()
+    
+    @classmethod
+    def _row_posted(cls, state: dict, rejection_code: str) -> bool:
+        return state['rendered'] and state['status'].upper() == 'R' and cls._same_code(state['rejection'], rejection_code)
+    
+    def _post_window(self, window: List[dict], rejection_code: str) -> None:
+        """Set every rendered row in the window to 'R', then enter all rejection codes in one action chain."""
+        dropdowns_changed = False
+        for state in window:
+            if state['status'] == 'R' or state['status_element'] is None:
+                continue
+            try:
+                keys = PostDropdown.keys_for(state['status'], 'R')
+            except ValueError:
+                logger.warning(f"Unexpected status '{state['status']}' on row {state['row']}, leaving it for per-row posting")
+                continue
+            # Keys typed before the menu opens are lost, so open and check each dropdown first
+            try:
+                state['status_element'].click()
+                if not wait_until(
+                    self.driver,
+                    lambda d: d.find_elements(*PostDropdown.MENU_LOCATOR),
+                    timeout=2,
+                    description=f"post dropdown menu of row {state['row']} to open"
+                ):
+                    logger.warning(f"Dropdown on row {state['row']} did not open, leaving it for per-row posting")
+                    continue
+                ActionChains(self.driver).send_keys(*keys).perform()
+            except WebDriverException as e:
+                # Earlier rows' ENTER/TAB can re-render the grid and stale the captured element
+                logger.warning(f"Dropdown on row {state['row']} could not be set ({type(e).__name__}), leaving it for per-row posting")
+                continue
+            dropdowns_changed = True
+        if dropdowns_changed:
+            wait_for_idle(self.driver)
+        
+        # Rejection fields only become editable once the status commits, so re-read them
+        states = self._read_row_states([state['row'] for state in window])
+        actions = ActionChains(self.driver)
+        codes_changed = False
+        for state in states:
+            if not state['rendered'] or state['status'] != 'R' or self._same_code(state['rejection'], rejection_code):
+                continue
+            actions.click(state['rejection_element'])\
+                .key_down(Keys.CONTROL).send_keys('a').key_up(Keys.CONTROL)\
+                .send_keys(rejection_code + Keys.TAB)
+            codes_changed = True
+        if codes_changed:
+            try:
+                actions.perform()
+            except WebDriverException as e:
+                logger.warning(f"Entering rejection codes in bulk stopped ({type(e).__name__}), unposted rows go per row")
+            wait_for_idle(self.driver)
+    
+    def populate_rows_bulk(self, row_numbers: List[int], rejection: Rejections) -> List[int]:
+        """Post 'R' and the rejection code to many rows, one rendered window of sBrg1 at a time.
+        
+        Each window is scrolled into view once, all of its visible rows are set together
+        and then verified with a single state read. Rows that did not commit fall back
+        to ``populate_row``.
+        
+        Args:
+            row_numbers: Row numbers to post
+            rejection: Rejection record providing the rejection code
+            
+        Returns:
+            Row numbers that could not be posted
+        """
+        rejection_code = rejection.RejCode1
+        pending = sorted(row_numbers)
+        failed = []
+        
+        while pending:
+            if self._scroll_to_row_by_transform(pending[0]):
+                window = [state for state in self._read_row_states(pending) if state['rendered']]
+            else:
+                # Don't post against whatever happens to be rendered
+                logger.warning(f"Could not scroll to row {pending[0]}, leaving it for per-row posting")
+                window = []
+            window_rows = [state['row'] for state in window]
+            if not window:
+                # Nothing rendered for the next row; let the per-row path scroll and retry
+                window_rows = [pending[0]]
+            else:
+                logger.debug(f"Posting rows {window_rows} in bulk")
+                self._post_window(window, rejection_code)
+            
+            states = self._read_row_states(window_rows)
+            retry_rows = [state['row'] for state in states if not self._row_posted(state, rejection_code)]
+            for row_number in retry_rows:
+                logger.warning(f"Row {row_number} did not commit in bulk, retrying per row")
+                try:
+                    self.populate_row(row_number, rejection)
+                except WebDriverException as e:
+                    logger.warning(f"Per-row retry of row {row_number} failed: {type(e).__name__}")
+            
+            if retry_rows:
+                states = self._read_row_states(retry_rows)
+                failed.extend(state['row'] for state in states if not self._row_posted(state, rejection_code))
+            pending = [row for row in pending if row not in window_rows]
+        
+        if failed:
+            logger.error(f"Rows not posted after bulk and per-row attempts: {failed}")
+        return failed
+    
+    def cancel_posting(self):
+        self.driver.find_element(*self.CANCEL_BUTTON).click()
+    
     def finalize_posting(self):
         # ensure no cash is posted
-        payment_amounts = float(self.driver.find_element(*self.BULK_PMT_FIELD).get_attribute('value'))
+        payment_value = FormSnapshot.take(self.driver).value(self.BULK_PMT_FIELD[1])
+        if payment_value is None:
+            logger.error("Payment amounts field not found.")
+            self.driver.find_element(*self.CANCEL_BUTTON).click()
+            return False
+        payment_amounts = float(payment_value)
         if payment_amounts != 0:
             logger.error("Payment amounts field is not zeroed out.")
             self.driver.find_element(*self.CANCEL_BUTTON).click()
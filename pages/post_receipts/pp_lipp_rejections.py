@@ -4,11 +4,12 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.keys import Keys
-import time
 from loguru import logger
 import re
 
+from pages.form_snapshot import FormSnapshot
 from utils.database import Rejections
+from utils.waits import wait_for_idle, wait_for_value
 
 class PP_LIPP_Rejections:
     ACTIVE_BUTTONS = (By.CSS_SELECTOR, 'button.fe_c_tabs__label.fe_is-selected')
@@ -25,8 +26,12 @@ class PP_LIPP_Rejections:
         self.on_rejection_screen = self._on_rejection_screen()
     
     def _on_rejection_screen(self):
-        active_buttons = WebDriverWait(self.driver, 10).until(EC.presence_of_all_elements_located(self.ACTIVE_BUTTONS))
-        return 'Rejections' in [button.text for button in active_buttons]
+        snapshot = FormSnapshot.wait_for(
+            self.driver, lambda s: bool(s.tabs), timeout=10, description="selected tabs"
+        )
+        if snapshot is None:
+            raise TimeoutException("No selected tab found")
+        return 'Rejections' in snapshot.tabs
         
     def _populate_input_field(self, base_locator, value):
         field_locator = (By.ID, f'{base_locator}')
@@ -36,26 +41,30 @@ class PP_LIPP_Rejections:
         input_field.send_keys(value)
     
     def enter_carrier(self, carrier_override: str =''):
-        time.sleep(0.5)
+        wait_for_idle(self.driver)
         carrier_value = self.rejection_dict.get('Carrier', carrier_override)
         logger.debug(f"Entering carrier: {carrier_value}")
         WebDriverWait(self.driver, 2).until(EC.element_to_be_clickable(self.CARRIER_INPUT))
         self._populate_input_field(self.CARRIER_INPUT[1], carrier_value)
-        time.sleep(0.5)
-        if not self.confirm_field_populated(self.CARRIER_INPUT, carrier_value):
-            time.sleep(1)
+        if not wait_for_value(self.driver, self.CARRIER_INPUT, carrier_value, timeout=2):
+            wait_for_idle(self.driver)
             self._populate_input_field(self.CARRIER_INPUT[1], carrier_value)
     
-    def confirm_field_populated(self, locator, expected_value):
-        field = WebDriverWait(self.driver, 10).until(EC.presence_of_element_located(locator))
-        actual_value = field.get_attribute('value')
-        return actual_value == expected_value
+    def confirm_field_populated(self, locator, expected_value, snapshot: FormSnapshot | None = None):
+        field_id = FormSnapshot.field_id(locator)
+        if snapshot is not None and snapshot.has(field_id):
+            return snapshot.value(field_id) == expected_value
+        field_value = FormSnapshot.wait_for_field(self.driver, field_id, timeout=10)
+        if field_value is None:
+            raise TimeoutException(f"Field {locator} not present")
+        return field_value == expected_value
     
     def close_screen(self):
         self.driver.find_element(*self.OK_BUTTON).click()
     
     def post_li_rejections(self):
         # TODO: theres an error when trying to change rejection 2 from IDX, not an issue with the script
+        snapshot = FormSnapshot.take(self.driver)
         for key, value in self.rejection_dict.items():
             if key.startswith('RejCode') and value:
                 match = re.search(r'\d+$', key)
@@ -64,7 +73,7 @@ class PP_LIPP_Rejections:
                     
                     ## POST REJECTION CODE
                     REJECTION_FIELD_LOCATOR = (By.ID, f'{self.REJECTION_FIELD_BASE}{index}')
-                    curr_rej_value = self.driver.find_element(*REJECTION_FIELD_LOCATOR).get_attribute('value')
+                    curr_rej_value = snapshot.value(REJECTION_FIELD_LOCATOR[1])
                     if not curr_rej_value:
                         logger.debug(f"Entering rejection code for {key}: {value}")
                         rejection_field = self.driver.find_element(*REJECTION_FIELD_LOCATOR)
@@ -93,4 +102,4 @@ class PP_LIPP_Rejections:
                     REJECTION_FIELD_LOCATOR = (By.ID, f'{self.REJECTION_FIELD_BASE}{str(index)}')
             elif key.startswith('RejCode') and not value:
                 logger.debug(f"No value for {key}")
-        time.sleep(1)
\ No newline at end of file
+        wait_for_idle(self.driver)
\ No newline at end of file
@@ -3,12 +3,14 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.keys import Keys
-import time
 from loguru import logger
 import re
 
+from pages.form_snapshot import FormSnapshot
+from pages.modals.modal_watcher import ModalWatcher
 from pages.modals.payment_code import PaymentCodesModal
 from utils.screenshot import ScreenshotManager
+from utils.waits import wait_for_idle, wait_for_value
 
 class PICScreen_Main:
     HEADER = (By.ID, "formHeader")
@@ -19,49 +21,41 @@ class PICScreen_Main:
     
     ADDITIONAL_TRANSACTION_FIELD = (By.ID, "sAf41r2")
     
-    LI_POST_CHECKBOX = (By.XPATH, "//input[@id='sAf32r1']")
+    LI_POST_CHECKBOX_ID = "sAf32r1"
+    LI_POST_CHECKBOX = (By.XPATH, f"//input[@id='{LI_POST_CHECKBOX_ID}']")
+    MODAL_OK = (By.ID, "modalButtonOk")
     
     def __init__(self, driver, screenshot_manager: ScreenshotManager | None = None):
         self.driver = driver
         self.screenshot_manager = screenshot_manager
     
+    def _header_text(self, timeout) -> str | None:
+        return FormSnapshot.wait_for_header(self.driver, timeout=timeout)
+    
     def get_current_batch_group(self):
-        try:
-            time.sleep(1)
-            header = WebDriverWait(self.driver, 3).until(
-                EC.presence_of_element_located(self.HEADER)
-            )
-            header_text = header.text
-            # check if header contains "Post Receipts"
-            match = re.search(r'Grp:(\d+)', header_text)
-            if match:
-                return match.group(1)
-            else:
-                return 0
-        except TimeoutException:
+        header_text = self._header_text(timeout=3)
+        if header_text is None:
+            return 0
+        # check if header contains "Post Receipts"
+        match = re.search(r'Grp:(\d+)', header_text)
+        if match:
+            return int(match.group(1))
+        else:
             return 0
     
     def in_pic_screen(self):
-        try:
-            time.sleep(1)
-            header = WebDriverWait(self.driver, 5).until(
-                EC.presence_of_element_located(self.HEADER)
-            )
-            header_text = header.text
-            # check if header contains "Post Receipts"
-            if "Post Receipts" in header_text:
-                logger.debug(f"PIC Screen header text: {header_text}")
-                return True
-            else:
-                return False
-        except TimeoutException:
-            return False
+        header_text = self._header_text(timeout=5)
+        # check if header contains "Post Receipts"
+        if header_text and "Post Receipts" in header_text:
+            logger.debug(f"PIC Screen header text: {header_text}")
+            return True
+        return False
     
     def _confirm_field_populated(self, locator: tuple, expected_value:str|None=None):
-        field = WebDriverWait(self.driver, 10).until(
-            EC.presence_of_element_located(locator)
-        )
-        field_value = field.get_attribute("value")
+        field_id = FormSnapshot.field_id(locator)
+        field_value = FormSnapshot.wait_for_field(self.driver, field_id, timeout=10)
+        if field_value is None:
+            raise TimeoutException(f"Field {locator} not present")
         if not expected_value:
             if field_value == "":
                 return False
@@ -94,10 +88,9 @@ class PICScreen_Main:
     
     def post_additional_transaction(self, paycode: str, record, comment: str = ""):
         self._enter_additional_transaction(paycode)
-        time.sleep(0.5)
-        if not self._confirm_field_populated(self.ADDITIONAL_TRANSACTION_FIELD, paycode):
+        if not wait_for_value(self.driver, self.ADDITIONAL_TRANSACTION_FIELD, paycode, timeout=2):
             logger.error(f"Additional Transaction field not populated with {paycode}, retrying")
-            time.sleep(0.5)
+            wait_for_idle(self.driver)
             self._enter_additional_transaction(paycode)
         
         AMT_FIELD = (By.ID, "sAf42r2")
@@ -114,24 +107,19 @@ class PICScreen_Main:
         self.driver.find_element(By.ID, "OK").click()
     
     def set_line_item_post_checkbox(self, post_line_item: bool):
-        def check_if_checkbox_selected(element):
-            is_checked = element.is_selected()
-            logger.debug(f"Checkbox selected: {is_checked}")
-            return is_checked
-
         def toggle_checkbox(element):
             element.send_keys(Keys.SPACE)
                 
         li_post_checkbox = WebDriverWait(self.driver, 10).until(EC.element_to_be_clickable(self.LI_POST_CHECKBOX))
-        is_checked = li_post_checkbox.is_selected()
+        is_checked = FormSnapshot.take(self.driver).checked(self.LI_POST_CHECKBOX_ID)
         logger.debug(f"Line Item Post Checkbox selected: {is_checked}")
         
         if post_line_item:
-            if not check_if_checkbox_selected(li_post_checkbox):
+            if not is_checked:
                 toggle_checkbox(li_post_checkbox)
             self.open_line_item_posting()
         else:
-            if check_if_checkbox_selected(li_post_checkbox):
+            if is_checked:
                 toggle_checkbox(li_post_checkbox)
     
     def enter_paycode(self, paycode:str| None = None): 
@@ -145,20 +133,19 @@ class PICScreen_Main:
                 logger.error("No paycode options available")
                 return
         
-        time.sleep(0.5)
+        wait_for_idle(self.driver)
         code_field = WebDriverWait(self.driver, 10).until(EC.element_to_be_clickable(self.CODE_FIELD))
         code_field.click()
         code_field.clear()
         code_field.send_keys(paycode + Keys.TAB)
         
-        # check for modal
-        try:
-            MODAL_OK = MODAL_OK = (By.ID, "modalButtonOk")
-            modal = self.driver.find_element(*MODAL_OK)            
-            modal.click()
+        # check for modal raised by the paycode lookup
+        modal = ModalWatcher(self.driver).wait_for_open()
+        if modal and modal['kind'] == 'modal':
+            logger.debug(f"Modal after paycode entry: {modal['text']!r}")
+            self.driver.find_element(*self.MODAL_OK).click()
             return False
-        except Exception:
-            return True
+        return True
     
     def open_paycode_modal(self):
         self.driver.find_element(*self.CODE_MAGNIFY_ICON).click()        
@@ -3,11 +3,14 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, ElementClickInterceptedException
 from selenium.webdriver.common.keys import Keys
-import time
+from selenium.webdriver.common.action_chains import ActionChains
 from loguru import logger
 
+from pages.form_snapshot import FormSnapshot
 from pages.modals.batch_modal import BatchModal
 from utils.notify import send_error_notification
+from utils.tracing import traced
+from utils.waits import wait_for_idle, wait_for_overlay_gone
 
 class PaymentPostingBatch:
     BATCH_HEADER = (By.CLASS_NAME, "fe_c_tabs__label-text")
@@ -22,6 +25,8 @@ class PaymentPostingBatch:
     
     OK_BUTTON = (By.ID, "OK")
     
+    FIND_FIELDS_SCRIPT = "return arguments[0].map(function (id) { return document.getElementById(id); });"
+    
     batch_number = ''
     
     def __init__(self, driver):
@@ -41,7 +46,7 @@ class PaymentPostingBatch:
                 return True
             except ElementClickInterceptedException as e:
                 logger.debug(f"Click intercepted on attempt {attempt} for locator {locator}: {e}. Retrying...")
-                time.sleep(0.5)
+                wait_for_overlay_gone(self.driver, timeout=2)
             except TimeoutException:
                 logger.warning(f"Timed out waiting for element to be clickable: {locator}")
                 return False
@@ -92,48 +97,62 @@ class PaymentPostingBatch:
         except TimeoutException:
             return False
     
-    def _check_batch_fields(self) -> bool | list:
-        fields_to_check = {
-            "BATCH_NUMBER_FIELD": self.BATCH_NUMBER_FIELD,
-            "BANK_DESPOIT_DATE_FIELD": self.BANK_DESPOIT_DATE_FIELD,
-            "DESCRIPTION_FIELD": self.DESCRIPTION_FIELD,
-            "PAYMENT_TYPE_FIELD": self.PAYMENT_TYPE_FIELD,
-            "PAYMENTS_FIELD": self.PAYMENTS_FIELD,
-            "ACTIONS_FIELD": self.ACTIONS_FIELD
+    def _field_config(self) -> dict:
+        """Map each batch field name to its locator and the value typed into it, in entry order."""
+        return {
+            "BATCH_NUMBER_FIELD": (self.BATCH_NUMBER_FIELD, "G"),
+            "BANK_DESPOIT_DATE_FIELD": (self.BANK_DESPOIT_DATE_FIELD, "T"),
+            "DESCRIPTION_FIELD": (self.DESCRIPTION_FIELD, "AUTO - PIC Scripting"),
+            "PAYMENT_TYPE_FIELD": (self.PAYMENT_TYPE_FIELD, "3"),
+            "PAYMENTS_FIELD": (self.PAYMENTS_FIELD, "0"),
+            "ACTIONS_FIELD": (self.ACTIONS_FIELD, "O"),
         }
+    
+    def _read_batch_fields(self, timeout: float = 5) -> dict | None:
+        """Read every batch field value in a single script call.
         
-        empty_fields = []
+        Args:
+            timeout: Seconds to wait for all fields to be present
+            
+        Returns:
+            Dict of field name to value, or None if any field never appeared
+        """
+        field_config = self._field_config()
+        ids = {name: FormSnapshot.field_id(locator) for name, (locator, _) in field_config.items()}
+        snapshot = FormSnapshot.wait_for(
+            self.driver,
+            lambda s: all(s.has(field_id) for field_id in ids.values()),
+            timeout=timeout,
+            description="batch fields to be present"
+        )
+        if snapshot is None:
+            return None
+        return {name: snapshot.value(field_id) for name, field_id in ids.items()}
+    
+    def _check_batch_fields(self) -> bool | list:
+        field_values = self._read_batch_fields()
+        if field_values is None:
+            logger.warning("Batch fields not found within timeout.")
+            return False
         
-        for field_name, locator_tuple in fields_to_check.items():
-            try:
-                # Use the locator_tuple for the wait condition
-                WebDriverWait(self.driver, 5).until(
-                    EC.presence_of_element_located(locator_tuple)
-                )
-                # Use the locator_tuple to find the element
-                field_value = self.driver.find_element(*locator_tuple).get_attribute("value")
-                if field_value == "":
-                    empty_fields.append(field_name)
-                    logger.warning(f"Field {field_name} is empty.")
-                    if field_name == "ACTIONS_FIELD":
-                        send_error_notification(f"Actions field is empty in batch {self.batch_number}. Cannot proceed.")
-                        batch_modal = BatchModal(self.driver)
-                        if batch_modal._is_modal_open():
-                            batch_modal.select_post_receipts()
-                    else:
-                        logger.error(f"Field {field_name} is empty. Cannot proceed.")
-                    return empty_fields
-                
-                # Log using the string key (field_name)
+        if field_values["BATCH_NUMBER_FIELD"]:
+            self.batch_number = field_values["BATCH_NUMBER_FIELD"]
+        
+        empty_fields = [name for name, value in field_values.items() if value == ""]
+        for field_name, field_value in field_values.items():
+            if field_value:
                 logger.debug(f"Field {field_name} is present with value: {field_value}")
-
-            except TimeoutException:
-                logger.warning(f"Field {field_name} not found within timeout.")
-                return False
-            except Exception as e:
-                logger.error(f"Error checking field {field_name}: {e}")
-                return False
-        return True
+        
+        if not empty_fields:
+            return True
+        
+        logger.warning(f"Fields are empty: {empty_fields}")
+        if "ACTIONS_FIELD" in empty_fields:
+            send_error_notification(f"Actions field is empty in batch {self.batch_number}. Cannot proceed.")
+            batch_modal = BatchModal(self.driver)
+            if batch_modal._is_modal_open():
+                batch_modal.select_post_receipts()
+        return empty_fields
     
     def _populate_field(self, field_name: str) -> bool:
         """Populate a single batch field with its configured value.
@@ -144,14 +163,7 @@ class PaymentPostingBatch:
         Returns:
             True if field was populated successfully, False otherwise
         """
-        field_config = {
-            "BATCH_NUMBER_FIELD": (self.BATCH_NUMBER_FIELD, "G"),
-            "BANK_DESPOIT_DATE_FIELD": (self.BANK_DESPOIT_DATE_FIELD, "T"),
-            "DESCRIPTION_FIELD": (self.DESCRIPTION_FIELD, "AUTO - PIC Scripting"),
-            "PAYMENT_TYPE_FIELD": (self.PAYMENT_TYPE_FIELD, "3"),
-            "PAYMENTS_FIELD": (self.PAYMENTS_FIELD, "0"),
-            "ACTIONS_FIELD": (self.ACTIONS_FIELD, "O"),
-        }
+        field_config = self._field_config()
         
         if field_name not in field_config:
             logger.error(f"Unknown field name: {field_name}")
@@ -163,13 +175,44 @@ class PaymentPostingBatch:
             curr_field = self.driver.find_element(*locator)
             curr_field.click()
             curr_field.send_keys(value + Keys.TAB)
-            time.sleep(0.5)
+            wait_for_idle(self.driver)
             logger.debug(f"Populated field {field_name} with value '{value}'")
             return True
         except Exception as e:
             logger.error(f"Failed to populate field {field_name}: {e}")
             return False
     
+    def _populate_all_fields(self) -> list:
+        """Type every batch field in one action chain, then verify them with one read.
+        
+        Fields that did not commit fall back to per-field keystrokes.
+        
+        Returns:
+            Names of fields that are still empty
+        """
+        field_config = self._field_config()
+        ids = [locator[1] for locator, _ in field_config.values()]
+        try:
+            elements = self.driver.execute_script(self.FIND_FIELDS_SCRIPT, ids)
+            actions = ActionChains(self.driver)
+            for element, (_, value) in zip(elements, field_config.values()):
+                actions.click(element).send_keys(value + Keys.TAB)
+            actions.perform()
+            wait_for_idle(self.driver)
+        except Exception as e:
+            logger.warning(f"Batch field fast path failed, falling back to per-field entry: {e}")
+        
+        field_values = self._read_batch_fields() or {}
+        uncommitted = [name for name in field_config if not field_values.get(name)]
+        for field_name in uncommitted:
+            logger.debug(f"Field {field_name} did not commit, retrying with keystrokes")
+            self._populate_field(field_name)
+        
+        if uncommitted:
+            field_values = self._read_batch_fields() or {}
+        return [name for name in field_config if not field_values.get(name)]
+    
+    @traced("open_batch")
     def open_batch(self, max_retries: int = 3):
         """Open a new batch or use an existing one, with retry logic for failed field population.
         
@@ -181,34 +224,20 @@ class PaymentPostingBatch:
         """
         if not self.is_batch_open():
             logger.info("No batch is currently open. Opening a new batch.")
-            time.sleep(1)
             
             WebDriverWait(self.driver, 5).until(
                 EC.presence_of_element_located(self.BATCH_NUMBER_FIELD)
             )
-            time.sleep(3)
-        
-            # Initial population of all fields
-            field_order = [
-                "BATCH_NUMBER_FIELD",
-                "BANK_DESPOIT_DATE_FIELD",
-                "DESCRIPTION_FIELD",
-                "PAYMENT_TYPE_FIELD",
-                "PAYMENTS_FIELD",
-                "ACTIONS_FIELD",
-            ]
-            
-            for field_name in field_order:
-                self._populate_field(field_name)
+            wait_for_idle(self.driver)
+        
+            # Populate all fields in one pass; only uncommitted fields are retyped
+            self._populate_all_fields()
         else:
             # Existing batch open; ensure actions field is safely clickable.
             if not self._safe_click(self.ACTIONS_FIELD):
                 logger.error("Could not focus Actions field due to persistent interception.")
                 return False
         
-        self.batch_number = self.driver.find_element(*self.BATCH_NUMBER_FIELD).get_attribute("value")
-        logger.info(f"Batch number set to: {self.batch_number}")
-        
         # Check fields and retry if any are empty
         retry_count = 0
         while retry_count < max_retries:
@@ -216,6 +245,7 @@ class PaymentPostingBatch:
             
             if batch_fields_check is True:
                 # All fields populated successfully
+                logger.info(f"Batch number set to: {self.batch_number}")
                 if not self._safe_click(self.OK_BUTTON):
                     logger.error("Failed to click OK button after filling batch fields.")
                     return False
@@ -229,8 +259,8 @@ class PaymentPostingBatch:
                     logger.info(f"Retrying to populate field: {empty_field}")
                     self._populate_field(empty_field)
                 
-                # Small delay before re-checking
-                time.sleep(1)
+                # Let IDX commit the retried fields before re-checking
+                wait_for_idle(self.driver)
             else:
                 # Unexpected return value (e.g., False from timeout)
                 logger.error(f"Unexpected batch_fields_check result: {batch_fields_check}")
@@ -238,4 +268,4 @@ class PaymentPostingBatch:
         
         # If we exhausted retries, log final failure
         logger.error(f"Failed to populate all batch fields after {max_retries} retries.")
-        return False
\ No newline at end of file
+        return False
@@ -4,11 +4,13 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.keys import Keys
-import time
 from loguru import logger
 
+from pages.form_snapshot import FormSnapshot
+from pages.modals.modal_watcher import ModalWatcher
 from pages.modals.reset_modal import ResetModal
 from utils.screenshot import ScreenshotManager
+from utils.waits import wait_for_dom_settled, wait_for_idle, wait_for_value
 
 
 class PP_SelectPatient:
@@ -19,7 +21,6 @@ class PP_SelectPatient:
     ACTIONS_CODE_LIST = (By.ID, 'rcm-dbms-action-code-area')
     RESET_BUTTON = (By.ID, 'selectorActionCodeX')
     
-    DECEASED_MODAL_INDICATOR = (By.CSS_SELECTOR, "div.fe_c_overlay__dialog.fe_c_modal__dialog.fe_c_modal__dialog--large.fe_c_modal__dialog--padded.fe_is-info")
     MODAL_CLOSE = (By.ID, "modalButtonOk")
     
     CLEARABLE_MODALS = [
@@ -31,21 +32,24 @@ class PP_SelectPatient:
         self.screenshot_manager = screenshot_manager
     
     def _confirm_field_populated(self, field_locator, expected_value, timeout=5):
-        try:
-            WebDriverWait(self.driver, timeout).until(
-                lambda d: d.find_element(*field_locator).get_attribute("value") == expected_value
-            )
-            return True
-        except TimeoutException:
-            return False
+        field_id = FormSnapshot.field_id(field_locator)
+        return FormSnapshot.wait_for_field(
+            self.driver,
+            field_id,
+            lambda value: value == expected_value,
+            timeout=timeout,
+            description=f"field {field_id} to equal {expected_value!r}"
+        ) is not None
     
     def reset_patient(self):
-        time.sleep(0.5)
-        invoice_field = WebDriverWait(self.driver, 3).until(
-            EC.presence_of_element_located(self.INVOICE_LOCATOR)
+        wait_for_idle(self.driver)
+        invoice_field_id = FormSnapshot.field_id(self.INVOICE_LOCATOR)
+        invoice_value = FormSnapshot.wait_for_field(
+            self.driver, invoice_field_id, timeout=3, description="invoice field"
         )
-        invoice_field_value = invoice_field.get_attribute("value")
-        if not invoice_field_value:
+        if invoice_value is None:
+            raise TimeoutException("Invoice field not present")
+        if not invoice_value:
             logger.debug("Invoice field already empty, no reset needed.")
             return
         
@@ -66,18 +70,16 @@ class PP_SelectPatient:
         WebDriverWait(self.driver, 10).until(
             EC.presence_of_element_located(self.PATIENT_LOCATOR)
         )
-        time.sleep(0.5)
             
         if self._confirm_field_populated(self.INVOICE_LOCATOR, ''):
             logger.debug("Patient successfully reset.")
-            time.sleep(0.5)
             
         patient_field = self.driver.find_element(*self.PATIENT_LOCATOR)
         patient_field.send_keys("-" + invoice_number)
-        time.sleep(0.5)
+        wait_for_value(self.driver, self.PATIENT_LOCATOR, "-" + invoice_number, timeout=2)
         patient_field.send_keys(Keys.TAB)
 
-        time.sleep(0.5)
+        wait_for_idle(self.driver)
         reset_modal = ResetModal(self.driver, self.screenshot_manager)
         modal_text = reset_modal.close_if_present()
         if modal_text is not None:
@@ -91,24 +93,20 @@ class PP_SelectPatient:
                 EC.element_to_be_clickable(self.INVOICE_LOCATOR))
             if not self._confirm_field_populated(self.INVOICE_LOCATOR, invoice_number):
                 logger.error("Invoice number field not populated after entry, retrying")
-                time.sleep(0.5)
                 patient_field.click()
                 patient_field.clear()
-                time.sleep(1)
+                wait_for_dom_settled(self.driver)
                 patient_field.send_keys("-" + invoice_number)
-                time.sleep(1)
+                wait_for_value(self.driver, self.PATIENT_LOCATOR, "-" + invoice_number, timeout=2)
                 patient_field.send_keys(Keys.TAB)
+                wait_for_idle(self.driver)
             return True
         
             
     
     def check_for_deceased_modal(self):
-        try:
-            modal = WebDriverWait(self.driver, 3).until(
-                EC.presence_of_element_located(self.DECEASED_MODAL_INDICATOR)
-            )
-            if "Deceased" in modal.text:
-                self.driver.find_element(*self.MODAL_CLOSE).click()
-                logger.info("Modal detected and closed.")
-        except TimeoutException:
+        if ModalWatcher(self.driver).wait_for_open(ResetModal.MODAL_CLASSES, "Deceased", timeout=3):
+            self.driver.find_element(*self.MODAL_CLOSE).click()
+            logger.info("Modal detected and closed.")
+        else:
             logger.debug("No modal detected.")
\ No newline at end of file
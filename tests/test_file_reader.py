@@ -0,0 +1,63 @@
+"""The csv and pandas engines must produce the same records for the same input file.
+
+Run from the repository root with ``python -m unittest discover tests``.
+"""
+
+import os
+import tempfile
+import unittest
+
+from utils.file_reader import InputFile, read_csv_rows
+
+SAMPLE_CSV = """Invoice Number,Carrier,Paycode,LIPost,Group,LineItemPost,Completed,Rej Code 1,Column1
+123456789,aetna,045,0,3,False,0,CO45,
+123456790,AETNA,901,1,4,True,1,CO45,
+123456791,,100,0,5,False,,PR1,
+123456792,CIGNA,901,1,6,True,0,N30,
+123456793,NOT A CARRIER,100,0,3,False,0,CO45,
+123456794,,100,1,3,True,0,CO45,
+"""
+
+
+def _records(file_path: str, engine: str) -> list:
+    input_file = InputFile(file_path, db_manager=None, chunk_rows=0, ingest=False, engine=engine)
+    input_file.load_data()
+    return sorted(input_file.to_records(), key=lambda record: record['InvoiceNumber'])
+
+
+class EngineParityTest(unittest.TestCase):
+    def setUp(self):
+        handle, self.file_path = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(handle, 'w', newline='') as f:
+            f.write(SAMPLE_CSV)
+
+    def tearDown(self):
+        os.remove(self.file_path)
+
+    def test_csv_engine_parses_flags_as_numbers(self):
+        _, rows = read_csv_rows(self.file_path, "sample.csv")
+        first = rows[0]
+        self.assertEqual(first['LIPost'], 0)
+        self.assertIs(first['LineItemPost'], False)
+        self.assertIs(first['Completed'], False)
+        self.assertIs(rows[1]['Completed'], True)
+        self.assertIs(rows[2]['Completed'], False)
+
+    def test_engines_produce_the_same_records(self):
+        try:
+            import pandas  # noqa: F401
+        except ImportError:
+            self.skipTest("pandas is not installed")
+        csv_records = _records(self.file_path, 'csv')
+        pandas_records = _records(self.file_path, 'pandas')
+        self.assertEqual(csv_records, pandas_records)
+        # Rows with a bad carrier or LIPost without a carrier are dropped by validation
+        self.assertEqual(
+            [record['InvoiceNumber'] for record in csv_records],
+            [123456789, 123456790, 123456791, 123456792]
+        )
+        self.assertEqual([record['Completed'] for record in csv_records], [False, True, False, False])
+
+
+if __name__ == '__main__':
+    unittest.main()
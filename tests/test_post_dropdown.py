@@ -0,0 +1,40 @@
+"""The LIPP status dropdown must be read under the id FormSnapshot keys it by.
+
+Run from the repository root with ``python -m unittest discover tests``.
+"""
+
+import unittest
+
+from selenium.webdriver.common.keys import Keys
+
+from pages.form_snapshot import FormSnapshot
+from pages.post_receipts.post_dropdown import PostDropdown
+from pages.post_receipts.pp_lipp import PP_LIPP
+
+
+class FakeDriver:
+    """Answers the snapshot script for a LIPP grid row, applying its closest-ancestor rule."""
+    # Each select's ancestor ids, outermost first: grid > row container > status field
+    SELECTS = [(['sBrg1', 'sBrg1r3', 'sBf51r3'], 'N')]
+
+    def execute_script(self, script, *args):
+        assert script == FormSnapshot.SCRIPT
+        selects = {}
+        for ancestors, text in self.SELECTS:
+            owner = next(a for a in reversed(ancestors) if a.startswith(('sA', 'sB')))
+            selects.setdefault(owner, text)
+        return {'selects': selects}
+
+
+class StatusDropdownTest(unittest.TestCase):
+    def test_row_id_matches_snapshot_key(self):
+        dropdown = PP_LIPP(FakeDriver()).status_dropdown(3, row_element=None)
+        self.assertEqual(dropdown.row_id, 'sBf51r3')
+        self.assertEqual(dropdown.get_value(), 'N')
+
+    def test_keys_count_from_the_read_value(self):
+        self.assertEqual(PostDropdown.keys_for('N', 'R'), [Keys.ARROW_DOWN, Keys.ENTER, Keys.TAB])
+
+
+if __name__ == '__main__':
+    unittest.main()
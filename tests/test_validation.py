@@ -0,0 +1,33 @@
+"""Validation fixes must keep working on the int64 flag columns pandas reads from 0/1.
+
+Run from the repository root with ``python -m unittest discover tests``.
+"""
+
+import unittest
+import warnings
+
+from utils.validation import apply_rules
+
+
+class LIPostFixTest(unittest.TestCase):
+    def test_901_fix_on_int_lipost_column(self):
+        try:
+            import pandas as pd
+        except ImportError:
+            self.skipTest("pandas is not installed")
+        data = pd.DataFrame({
+            'InvoiceNumber': [123456789, 123456790],
+            'Paycode': ['901', '100'],
+            'LIPost': pd.Series([1, 0], dtype='int64'),
+            'Carrier': ['AETNA', 'AETNA'],
+        })
+        with warnings.catch_warnings():
+            # pandas 2 warns and pandas 3 raises when a bool is set into an int64 column
+            warnings.simplefilter("error", FutureWarning)
+            result, dropped = apply_rules(data)
+        self.assertEqual(dropped, 0)
+        self.assertEqual(result['LIPost'].tolist(), [False, False])
+
+
+if __name__ == '__main__':
+    unittest.main()
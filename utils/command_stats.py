@@ -0,0 +1,179 @@
+"""WebDriver command accounting for finding which page methods cost the most round trips."""
+
+import csv
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from loguru import logger
+
+# Constants
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+PAGES_DIR = str(PROJECT_ROOT / "pages")
+# Shared helpers in pages/ whose commands belong to the page method that called them
+HELPER_FILES = {
+    str(PROJECT_ROOT / "pages" / "form_snapshot.py"),
+    str(PROJECT_ROOT / "pages" / "modals" / "modal_watcher.py"),
+}
+SKIPPED_FILES = {str(PROJECT_ROOT / "utils" / "command_stats.py"), str(PROJECT_ROOT / "utils" / "waits.py")}
+NO_REJECTION = "(outside rejection)"
+
+
+class CommandAccountant:
+    """Counts and times every WebDriver command, attributed to a page method and the current invoice.
+
+    ``install`` wraps ``driver.execute``, which every Selenium command (element lookups,
+    attribute reads, keystrokes, scripts and the polls inside waits) goes through.
+    Commands issued while polling a ``WebDriverWait`` are recorded as ``wait/<command>``.
+    """
+
+    def __init__(self, max_commands: Optional[int] = None, max_seconds: Optional[float] = None):
+        """Initialize the accountant.
+
+        Args:
+            max_commands: Flag rejections issuing more commands than this (default: COMMAND_BUDGET env var)
+            max_seconds: Flag rejections taking longer than this (default: COMMAND_BUDGET_SECONDS env var)
+        """
+        if max_commands is None and os.getenv("COMMAND_BUDGET"):
+            max_commands = int(os.getenv("COMMAND_BUDGET", ""))
+        if max_seconds is None and os.getenv("COMMAND_BUDGET_SECONDS"):
+            max_seconds = float(os.getenv("COMMAND_BUDGET_SECONDS", ""))
+        self.max_commands = max_commands
+        self.max_seconds = max_seconds
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._rejections: Dict[str, dict] = defaultdict(self._new_entry)
+        self._methods: Dict[Tuple[str, str], list] = defaultdict(lambda: [0, 0.0])
+
+    @staticmethod
+    def _new_entry() -> dict:
+        return {"commands": 0, "command_seconds": 0.0, "wall_seconds": 0.0, "methods": Counter(), "over_budget": False}
+
+    def install(self, driver):
+        """Wrap ``driver.execute`` so every command is counted. Returns the same driver."""
+        execute = driver.execute
+
+        def counted_execute(driver_command, params=None):
+            start = time.perf_counter()
+            try:
+                return execute(driver_command, params)
+            finally:
+                self._record(driver_command, time.perf_counter() - start)
+
+        driver.execute = counted_execute
+        driver.command_accountant = self
+        return driver
+
+    def _attribute(self) -> tuple:
+        """Find the page-object method that issued the current command."""
+        frame = sys._getframe(3)
+        fallback = None
+        in_wait = False
+        while frame is not None:
+            filename = frame.f_code.co_filename
+            if "selenium" in filename:
+                in_wait = in_wait or filename.endswith(os.path.join("support", "wait.py"))
+            elif filename not in SKIPPED_FILES:
+                if filename.startswith(PAGES_DIR) and filename not in HELPER_FILES:
+                    return frame.f_code.co_qualname, in_wait
+                if fallback is None and filename not in HELPER_FILES:
+                    fallback = frame.f_code.co_qualname
+            frame = frame.f_back
+        return fallback or "(unknown)", in_wait
+
+    def _record(self, driver_command: str, elapsed: float) -> None:
+        method, in_wait = self._attribute()
+        command = f"wait/{driver_command}" if in_wait else driver_command
+        invoice = getattr(self._local, "invoice", None) or NO_REJECTION
+        with self._lock:
+            entry = self._rejections[invoice]
+            entry["commands"] += 1
+            entry["command_seconds"] += elapsed
+            entry["methods"][method] += 1
+            totals = self._methods[(method, command)]
+            totals[0] += 1
+            totals[1] += elapsed
+
+    @contextmanager
+    def rejection(self, invoice_number):
+        """Attribute commands issued in this thread to ``invoice_number`` and check the budget on exit."""
+        invoice = str(invoice_number)
+        self._local.invoice = invoice
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._local.invoice = None
+            with self._lock:
+                entry = self._rejections[invoice]
+                entry["wall_seconds"] += time.perf_counter() - start
+                commands, wall_seconds = entry["commands"], entry["wall_seconds"]
+                over_budget = (
+                    (self.max_commands is not None and commands > self.max_commands)
+                    or (self.max_seconds is not None and wall_seconds > self.max_seconds)
+                )
+                entry["over_budget"] = over_budget
+                top_methods = entry["methods"].most_common(3)
+            logger.debug(f"Invoice {invoice}: {commands} WebDriver commands in {wall_seconds:.1f}s")
+            if over_budget:
+                logger.warning(
+                    f"Invoice {invoice} over command budget: {commands} commands "
+                    f"(max {self.max_commands}), {wall_seconds:.1f}s (max {self.max_seconds}). "
+                    f"Top methods: {top_methods}"
+                )
+
+    def write_report(self, log_folder_path: Path) -> None:
+        """Write per-rejection and per-method command tables as CSV files in the log folder.
+
+        Args:
+            log_folder_path: The run's log folder
+        """
+        with self._lock:
+            rejections = {
+                invoice: {**entry, "methods": Counter(entry["methods"])}
+                for invoice, entry in self._rejections.items()
+            }
+            methods = {key: list(totals) for key, totals in self._methods.items()}
+
+        rejection_path = Path(log_folder_path) / "command_stats_by_rejection.csv"
+        with open(rejection_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["InvoiceNumber", "Commands", "CommandSeconds", "WallSeconds", "OverBudget", "TopMethods"])
+            for invoice, entry in sorted(rejections.items(), key=lambda item: -item[1]["commands"]):
+                writer.writerow([
+                    invoice,
+                    entry["commands"],
+                    f"{entry['command_seconds']:.3f}",
+                    f"{entry['wall_seconds']:.3f}",
+                    entry["over_budget"],
+                    "; ".join(f"{method}={count}" for method, count in entry["methods"].most_common(5)),
+                ])
+
+        method_path = Path(log_folder_path) / "command_stats_by_method.csv"
+        with open(method_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Method", "Command", "Count", "TotalSeconds"])
+            for (method, command), (count, seconds) in sorted(methods.items(), key=lambda item: -item[1][0]):
+                writer.writerow([method, command, count, f"{seconds:.3f}"])
+
+        flagged = sum(1 for entry in rejections.values() if entry["over_budget"])
+        logger.info(
+            f"Wrote WebDriver command stats for {len(rejections)} rejections to {rejection_path.parent} "
+            f"({flagged} over budget)"
+        )
+
+
+@contextmanager
+def track_rejection(driver, invoice_number):
+    """Attribute the driver's commands to ``invoice_number`` if the driver is instrumented."""
+    accountant = getattr(driver, "command_accountant", None)
+    if accountant is None:
+        yield
+        return
+    with accountant.rejection(invoice_number):
+        yield
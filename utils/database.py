@@ -1,13 +1,18 @@
 """Database models and management for rejection tracking system."""
 
 import os
-from typing import List, Optional
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 
 from loguru import logger
 from pydantic import ConfigDict, field_validator
-from sqlalchemy import CheckConstraint, and_
+from sqlalchemy import CheckConstraint, Index, and_, case, event, func, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlmodel import Field, Session, SQLModel, col, create_engine, select, update
 
+from utils.tracing import span, traced
+
 # Constants
 ALLOWED_CARRIERS = [
     "AARP", "AETNA", "AFFINITY", "ALICARE", "AMERICHOICE", "AMERIGROUP",
@@ -22,6 +27,23 @@ ALLOWED_CARRIERS = [
     "TRICARE", "UNION", "UNITED HEALTHCARE", "UNITED HEALTHCARE EMPIRE", "VYTRA",
     "WELLCARE", "WORKERS COMP", ""
 ]
+INSERT_CHUNK_SIZE = 5000
+WRITE_BEHIND_BATCH_SIZE = 50
+WRITE_BEHIND_INTERVAL_MS = 500
+
+# Storage profile applied to every new SQLite connection. WAL lets readers (reports,
+# other workers) run alongside the posting writer; with WAL, synchronous=NORMAL only
+# risks the last commits on power loss, not corruption.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -64000,       # 64 MB page cache (negative = KiB)
+    "mmap_size": 268435456,     # 256 MB memory-mapped I/O
+    "temp_store": "MEMORY",
+    "busy_timeout": 30000,      # ms to wait for a competing writer
+}
+SQLITE_POOL_SIZE = 8
+SQLITE_CACHED_STATEMENTS = 256
 
 
 class Rejections(SQLModel, table=True, extend_existing=True):
@@ -33,6 +55,14 @@ class Rejections(SQLModel, table=True, extend_existing=True):
             "Carrier IN ('AARP','AETNA','AFFINITY','ALICARE','AMERICHOICE','AMERIGROUP','AMERIHEALTH','ATLANTIS','BEECH STREET','BLUE CROSS BLUE SHIELD','CARECONNECT','CHOICE CARE','CIGNA','CONNECTICARE','COVENTRY','DEVON','EASY CHOICE','ELDERPLAN','FIDELIS','FIRST HEALTH','FIRST UNITED','GENERIC','GHI','GUARDIAN','HEALTHCARE PARTNERS','HEALTHFIRST','HEALTHNET','HEALTHPLUS','HIP','HORIZON','HUMANA','LIBERTY','LOCAL 1199','LOCAL 3','MAGELLAN','MAGNACARE','MANAGED CARE','MEDICAID','MEDICARE','MERITAIN','METROPLUS','MULTIPLAN','NATL PREFFERED PROV NETWORK','NEIGHBORHOOD','NO FAULT','OXFORD','PHCS','PHS','SELF PAY','TOUCHSTONE','TRICARE','UNION','UNITED HEALTHCARE','UNITED HEALTHCARE EMPIRE','VYTRA','WELLCARE','WORKERS COMP','') OR Carrier IS NULL",
             name="carrier_allowed_values",
         ),
+        # Pending work lookups filter on FileName/Group for rows that are neither
+        # completed nor failed; a partial index keeps only those rows
+        Index(
+            "ix_rejections_pending",
+            "FileName",
+            "Group",
+            sqlite_where=text("Completed = 0 AND Comment IS NULL"),
+        ),
     )
     
     model_config = ConfigDict(populate_by_name=True) # type: ignore
@@ -89,18 +119,105 @@ class Rejections(SQLModel, table=True, extend_existing=True):
         return bool(v)
 
 
+# Columns update_row may write; the primary key identifies the row and is never updated
+UPDATABLE_COLUMNS = frozenset(c.name for c in Rejections.__table__.columns) - {"InvoiceNumber", "FileName"}  # type: ignore[attr-defined]
+
+
+class CachedPaycode(SQLModel, table=True, extend_existing=True):
+    """Database model for paycodes resolved from the Payment Codes modal, one per group.
+    
+    The modal lists a group's MANUAL paycode regardless of carrier, so entries are
+    stored with Carrier ''; the column stays in the key so existing databases keep working.
+    """
+    
+    Group: int = Field(primary_key=True)
+    Carrier: str = Field(default='', primary_key=True)
+    Paycode: str
+    UpdatedAt: datetime = Field(default_factory=datetime.now)
+
+
+class IngestFingerprint(SQLModel, table=True, extend_existing=True):
+    """Database model for the size, mtime and content hash of each ingested input file."""
+    
+    FilePath: str = Field(primary_key=True)
+    FileName: str = Field(index=True)
+    Size: int
+    MTime: float
+    ContentHash: str
+    Rows: int = Field(default=0)
+    IngestedAt: datetime = Field(default_factory=datetime.now)
+
+
 class DBManager:
-    """Manages database operations for rejection tracking."""
+    """Manages database operations for rejection tracking.
+    
+    In write-behind mode ``update_row`` only queues the change. A background writer
+    coalesces queued changes per ``(InvoiceNumber, FileName)`` and commits them in one
+    transaction once ``batch_size`` rows are pending or every ``flush_interval_ms``.
+    ``flush`` (or ``update_row(..., flush=True)``) is a barrier that returns once
+    everything queued so far is committed.
+    """
     
     URL = f'sqlite:///{os.path.join(os.getcwd(), "rejections.db")}'
     
-    def __init__(self, url: str = URL):
+    def __init__(
+        self,
+        url: str = URL,
+        tuned: bool = True,
+        write_behind: bool = False,
+        batch_size: int = WRITE_BEHIND_BATCH_SIZE,
+        flush_interval_ms: int = WRITE_BEHIND_INTERVAL_MS
+    ):
         """Initialize database manager.
         
         Args:
             url: SQLite database URL (default: rejections.db in current directory)
+            tuned: Apply the SQLite storage profile (SQLITE_PRAGMAS, pooled connections,
+                statement cache); False uses SQLAlchemy's defaults
+            write_behind: Queue row updates and commit them from a background thread
+            batch_size: Pending rows that trigger a write-behind flush
+            flush_interval_ms: Longest time an update waits in the write-behind queue
         """
-        self.engine = create_engine(url)
+        # In-memory databases live in a single connection; only tune file databases
+        if tuned and url.startswith("sqlite:///") and ":memory:" not in url:
+            self.engine = self._create_tuned_engine(url)
+        else:
+            self.engine = create_engine(url)
+        self.write_behind = write_behind
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self._pending: Dict[Tuple[int, str], dict] = {}
+        self._pending_cond = threading.Condition()
+        # Held while a batch is taken off the queue and committed, so batches land in order
+        self._write_lock = threading.Lock()
+        self._closed = False
+        self._writer: Optional[threading.Thread] = None
+        if write_behind:
+            self._writer = threading.Thread(target=self._writer_loop, name="db-writer", daemon=True)
+            self._writer.start()
+    
+    @staticmethod
+    def _create_tuned_engine(url: str):
+        """Create a pooled engine whose connections apply SQLITE_PRAGMAS on connect."""
+        engine = create_engine(
+            url,
+            pool_size=SQLITE_POOL_SIZE,
+            max_overflow=SQLITE_POOL_SIZE,
+            connect_args={
+                # Pooled connections are shared by the worker and db-writer threads
+                "check_same_thread": False,
+                "cached_statements": SQLITE_CACHED_STATEMENTS,
+            },
+        )
+        
+        @event.listens_for(engine, "connect")
+        def apply_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma, value in SQLITE_PRAGMAS.items():
+                cursor.execute(f"PRAGMA {pragma}={value}")
+            cursor.close()
+        
+        return engine
     
     def get_engine(self):
         """Get the SQLAlchemy engine instance.
@@ -114,48 +231,62 @@ class DBManager:
         """Create database and all tables if they don't exist."""
         try:
             SQLModel.metadata.create_all(self.engine)
+            # create_all skips indexes of tables that already exist; add any new ones
+            for index in Rejections.__table__.indexes:  # type: ignore[attr-defined]
+                index.create(self.engine, checkfirst=True)
             logger.success("Database and tables created successfully.")
         except Exception as e:
             logger.error(f"Error creating database and tables: {e}")
             raise
     
-    def add_rejections(self, rejections: List[Rejections]) -> None:
-        """Add new rejection records to the database, avoiding duplicates.
+    def add_rejections(self, rejections: Sequence[Union[Rejections, dict]]) -> Tuple[int, int]:
+        """Add new rejection records to the database, skipping rows already stored.
+        
+        Rows are inserted with chunked ``INSERT ... ON CONFLICT DO NOTHING`` executemany
+        calls, so a row is skipped only when its ``(InvoiceNumber, FileName)`` key exists.
         
         Args:
-            rejections: List of Rejections objects to add
+            rejections: Rejections objects, or dicts keyed by column name
+            
+        Returns:
+            Tuple of (rows inserted, rows skipped as duplicates)
         """
         if not rejections:
             logger.debug("No rejections to add")
-            return
-            
-        with Session(self.engine) as session:
-            new_invoice_numbers = [r.InvoiceNumber for r in rejections]
-            new_filenames = [r.FileName for r in rejections]
-            
-            statement = (
-                select(Rejections.InvoiceNumber)
-                .where(col(Rejections.InvoiceNumber).in_(new_invoice_numbers))
-                .where(col(Rejections.FileName).in_(new_filenames))
-            )
-                
-            existing_numbers = set(session.exec(statement).all())
-            
-            new_rejections_to_add = [
-                r for r in rejections 
-                if r.InvoiceNumber not in existing_numbers
-            ]
-            
-            if new_rejections_to_add:
-                session.add_all(new_rejections_to_add)
-                session.commit()
-                logger.success(f"Added {len(new_rejections_to_add)} new rejections to the database.")
-            else:
-                logger.debug("All rejections already exist in database")
+            return 0, 0
+        
+        table = Rejections.__table__  # type: ignore[attr-defined]
+        defaults = {
+            name: field.get_default(call_default_factory=True)
+            for name, field in Rejections.model_fields.items()
+            if not field.is_required()
+        }
+        column_names = [c.name for c in table.columns]
+        stmt = sqlite_insert(table).on_conflict_do_nothing(index_elements=["InvoiceNumber", "FileName"])
+        
+        inserted = 0
+        with self.engine.begin() as conn:
+            for start in range(0, len(rejections), INSERT_CHUNK_SIZE):
+                chunk = rejections[start:start + INSERT_CHUNK_SIZE]
+                records = []
+                for rejection in chunk:
+                    values = rejection.model_dump(by_alias=False) if isinstance(rejection, Rejections) else rejection
+                    # executemany needs the same keys in every row
+                    records.append({name: values.get(name, defaults.get(name)) for name in column_names})
+                inserted += conn.execute(stmt, records).rowcount
+        
+        skipped = len(rejections) - inserted
+        if inserted:
+            logger.success(f"Added {inserted} new rejections to the database ({skipped} already stored).")
+        else:
+            logger.debug("All rejections already exist in database")
+        return inserted, skipped
     
     def get_unposted_invoices(self, file_name: str, group: int) -> List[Rejections]:
         """Get all unposted rejection records for a specific file and group.
         
+        Queued write-behind updates are flushed first.
+        
         Args:
             file_name: Name of the CSV file
             group: Group number
@@ -163,6 +294,7 @@ class DBManager:
         Returns:
             List of unposted Rejections objects
         """
+        self.flush()
         with Session(self.engine) as session:
             statement = select(Rejections).where(
                 Rejections.FileName == file_name,
@@ -172,51 +304,234 @@ class DBManager:
             )
             return list(session.exec(statement).all())
     
-    def update_row(self, rejection: Rejections) -> int:
+    def get_pending_work(self, file_name: str) -> Dict[int, List[Rejections]]:
+        """Get the unposted rejection records of every group in a file in one query.
+        
+        Queued write-behind updates are flushed first.
+        
+        Args:
+            file_name: Name of the CSV file
+            
+        Returns:
+            Unposted Rejections objects keyed by group number (groups with none are omitted)
+        """
+        self.flush()
+        with Session(self.engine) as session:
+            statement = select(Rejections).where(
+                Rejections.FileName == file_name,
+                Rejections.Completed == False,
+                Rejections.Comment == None
+            ).order_by(col(Rejections.Group))
+            pending: Dict[int, List[Rejections]] = {}
+            for rejection in session.exec(statement):
+                pending.setdefault(rejection.Group, []).append(rejection)
+            return pending
+    
+    def get_completion_counts(self, file_name: str) -> Dict[int, Dict[str, int]]:
+        """Count rejection records per group of a file by state, in one aggregate query.
+        
+        Queued write-behind updates are flushed first.
+        
+        Args:
+            file_name: Name of the CSV file
+            
+        Returns:
+            Dict of group number to ``{"total", "completed", "failed", "pending"}`` counts,
+            where failed rows are unposted rows with a Comment
+        """
+        self.flush()
+        completed = col(Rejections.Completed) == True
+        failed = and_(col(Rejections.Completed) == False, col(Rejections.Comment) != None)
+        pending = and_(col(Rejections.Completed) == False, col(Rejections.Comment) == None)
+        statement = (
+            select(
+                col(Rejections.Group),
+                func.count(),
+                func.sum(case((completed, 1), else_=0)),
+                func.sum(case((failed, 1), else_=0)),
+                func.sum(case((pending, 1), else_=0)),
+            )
+            .where(Rejections.FileName == file_name)
+            .group_by(col(Rejections.Group))
+        )
+        with Session(self.engine) as session:
+            return {
+                group: {"total": total, "completed": done, "failed": failed_count, "pending": pending_count}
+                for group, total, done, failed_count, pending_count in session.exec(statement)
+            }
+    
+    def get_fingerprint(self, file_path: str) -> Optional[IngestFingerprint]:
+        """Get the stored fingerprint of an input file.
+        
+        Args:
+            file_path: Resolved path of the input file
+            
+        Returns:
+            The fingerprint from the last successful ingest, or None
+        """
+        with Session(self.engine) as session:
+            return session.get(IngestFingerprint, file_path)
+    
+    def set_fingerprint(self, fingerprint: IngestFingerprint) -> None:
+        """Insert or replace the fingerprint of an input file after it was ingested.
+        
+        Args:
+            fingerprint: Fingerprint to store
+        """
+        with Session(self.engine) as session:
+            session.merge(fingerprint)
+            session.commit()
+    
+    def get_cached_paycode(self, group: int, max_age: timedelta) -> Optional[str]:
+        """Get a group's cached paycode if it is younger than ``max_age``.
+        
+        Args:
+            group: Group number
+            max_age: Maximum age of the cached entry
+            
+        Returns:
+            The cached paycode, or None if missing or expired
+        """
+        with Session(self.engine) as session:
+            entry = session.get(CachedPaycode, (group, ''))
+            if entry is None or datetime.now() - entry.UpdatedAt > max_age:
+                return None
+            return entry.Paycode
+    
+    def set_cached_paycode(self, group: int, paycode: str) -> None:
+        """Insert or refresh a group's cached paycode.
+        
+        Args:
+            group: Group number
+            paycode: Paycode to cache
+        """
+        with Session(self.engine) as session:
+            session.merge(CachedPaycode(Group=group, Carrier='', Paycode=paycode, UpdatedAt=datetime.now()))
+            session.commit()
+    
+    def delete_cached_paycode(self, group: int) -> None:
+        """Remove a group's cached paycode, e.g. after IDX rejected it.
+        
+        Args:
+            group: Group number
+        """
+        with Session(self.engine) as session:
+            entry = session.get(CachedPaycode, (group, ''))
+            if entry is not None:
+                session.delete(entry)
+                session.commit()
+    
+    @traced("db_update")
+    def update_row(self, rejection: Rejections, flush: bool = False) -> int:
         """Update a rejection record in the database.
         
         Args:
             rejection: Rejection object with updated values
+            flush: In write-behind mode, wait until this and every earlier queued update
+                is committed (use for final states such as Completed)
             
         Returns:
-            Number of rows updated (should be 0 or 1)
+            Number of rows updated (should be 0 or 1); in write-behind mode, 1 if the
+            update was queued
         """
         updates = rejection.model_dump(
             exclude_unset=True, 
             exclude_none=True, 
             by_alias=False      
         )
-        
-        # Don't update primary keys
-        updates.pop("InvoiceNumber", None)
-        updates.pop("FileName", None)
-        
-        valid_cols = {c.name for c in Rejections.__table__.columns}  # type: ignore[attr-defined]
-        updates = {k: v for k, v in updates.items() if k in valid_cols}
+        updates = {k: v for k, v in updates.items() if k in UPDATABLE_COLUMNS}
         
         if not updates:
             return 0
         
-        with Session(self.engine) as session:
-            # build where clause by chaining to satisfy type-checkers and
-            # ensure SQLAlchemy receives ColumnElement expressions
-            # Use the table column objects for SQL expressions to satisfy
-            # type-checkers and to avoid mixing Pydantic field objects with
-            # SQLAlchemy column expressions.
-            table_cols = getattr(Rejections, "__table__").c
-            stmt = (
-                update(Rejections)
-                .where(
-                    and_(
-                        table_cols.InvoiceNumber == rejection.InvoiceNumber,
-                        table_cols.FileName == rejection.FileName,
-                    )
+        if not self.write_behind:
+            with Session(self.engine) as session:
+                rowcount = self._apply_update(session, (rejection.InvoiceNumber, rejection.FileName), updates)
+                session.commit()
+                return rowcount
+        
+        key = (rejection.InvoiceNumber, rejection.FileName)
+        with self._pending_cond:
+            if self._closed:
+                raise RuntimeError("DBManager is closed")
+            # Later values win; the row is written once with the merged changes
+            self._pending[key] = {**self._pending.get(key, {}), **updates}
+            if len(self._pending) >= self.batch_size:
+                self._pending_cond.notify()
+        if flush:
+            self.flush()
+        return 1
+    
+    @staticmethod
+    def _apply_update(session: Session, key: Tuple[int, str], updates: dict) -> int:
+        # Use the table column objects for SQL expressions to satisfy
+        # type-checkers and to avoid mixing Pydantic field objects with
+        # SQLAlchemy column expressions.
+        table_cols = getattr(Rejections, "__table__").c
+        invoice_number, file_name = key
+        stmt = (
+            update(Rejections)
+            .where(
+                and_(
+                    table_cols.InvoiceNumber == invoice_number,
+                    table_cols.FileName == file_name,
                 )
-                .values(**updates)
             )
-            result = session.exec(stmt)
-            session.commit()
-            return result.rowcount or 0
+            .values(**updates)
+        )
+        result = session.exec(stmt)
+        return result.rowcount or 0
+    
+    def _write_pending(self) -> None:
+        """Commit everything queued so far in one transaction."""
+        with self._write_lock:
+            with self._pending_cond:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return
+            try:
+                with span("db_flush", rows=len(batch)), Session(self.engine) as session:
+                    for key, updates in batch.items():
+                        self._apply_update(session, key, updates)
+                    session.commit()
+            except Exception:
+                # Requeue under anything queued meanwhile, which is newer
+                with self._pending_cond:
+                    for key, updates in batch.items():
+                        self._pending[key] = {**updates, **self._pending.get(key, {})}
+                raise
+            logger.debug(f"Wrote {len(batch)} queued row updates")
+    
+    def _writer_loop(self) -> None:
+        while True:
+            with self._pending_cond:
+                self._pending_cond.wait_for(
+                    lambda: self._closed or len(self._pending) >= self.batch_size,
+                    timeout=self.flush_interval
+                )
+                closed = self._closed
+            try:
+                self._write_pending()
+            except Exception as e:
+                logger.error(f"Background write of queued row updates failed, will retry: {e}")
+            if closed:
+                return
+    
+    def flush(self) -> None:
+        """Block until every queued row update is committed. No-op without write-behind."""
+        if self.write_behind:
+            self._write_pending()
+    
+    def close(self) -> None:
+        """Stop the background writer after committing anything still queued."""
+        if self._writer is None:
+            return
+        with self._pending_cond:
+            self._closed = True
+            self._pending_cond.notify()
+        self._writer.join()
+        self._writer = None
+        self.flush()
         
 
 if __name__ == "__main__":
@@ -0,0 +1,133 @@
+"""Micro-benchmarks of input ingest and DBManager commit throughput.
+
+Times turning a synthetic input DataFrame into rows, per-row pydantic validation
+against ``frame_to_records``. Then, with and without the SQLite storage profile,
+seeds a synthetic Rejections table through ``add_rejections`` (timing the bulk
+ingest) and times single-row ``update_row`` commits (the posting thread's write
+pattern), alone and with a reader thread polling ``get_unposted_invoices``.
+
+Usage:
+    python -m utils.db_benchmark [--rows 100000] [--commits 2000]
+"""
+
+import argparse
+import random
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from utils.database import DBManager, Rejections
+from utils.file_reader import frame_to_records
+
+# Constants
+BENCH_FILE_NAME = "benchmark.csv"
+GROUPS = 50
+
+
+def seed(db_manager: DBManager, rows: int) -> float:
+    """Fill the Rejections table with ``rows`` synthetic unposted rejections.
+
+    Returns:
+        Seconds taken by ``add_rejections``
+    """
+    records = [
+        {
+            "InvoiceNumber": 100000000 + i,
+            "Carrier": "AETNA",
+            "LineItemPost": bool(i % 2),
+            "RejCode1": "CO45",
+            "Group": i % GROUPS,
+            "FileName": BENCH_FILE_NAME,
+            "Completed": False,
+        }
+        for i in range(rows)
+    ]
+    start = time.perf_counter()
+    db_manager.add_rejections(records)
+    return time.perf_counter() - start
+
+
+def time_materialize(rows: int) -> tuple:
+    """Return seconds to materialize ``rows`` input rows per row with pydantic and column-wise."""
+    data = pd.DataFrame({
+        "InvoiceNumber": range(100000000, 100000000 + rows),
+        "Carrier": "AETNA",
+        "Paycode": "",
+        "LineItemPost": [bool(i % 2) for i in range(rows)],
+        "RejCode1": "CO45",
+        "Group": [i % GROUPS for i in range(rows)],
+        "Completed": False,
+        "FileName": BENCH_FILE_NAME,
+    })
+    start = time.perf_counter()
+    [Rejections.model_validate(row.to_dict()) for _, row in data.iterrows()]
+    per_row = time.perf_counter() - start
+    start = time.perf_counter()
+    frame_to_records(data)
+    columnar = time.perf_counter() - start
+    return per_row, columnar
+
+
+def time_commits(db_manager: DBManager, rows: int, commits: int, with_reader: bool) -> tuple:
+    """Commit ``commits`` single-row updates and return (commits per second, reader queries)."""
+    rng = random.Random(0)
+    stop = threading.Event()
+    reads = [0]
+
+    def reader():
+        reader_rng = random.Random(1)
+        while not stop.is_set():
+            db_manager.get_unposted_invoices(BENCH_FILE_NAME, reader_rng.randrange(GROUPS))
+            reads[0] += 1
+
+    reader_thread = threading.Thread(target=reader, daemon=True) if with_reader else None
+    if reader_thread:
+        reader_thread.start()
+    start = time.perf_counter()
+    for n in range(commits):
+        rejection = Rejections.model_construct(
+            InvoiceNumber=100000000 + rng.randrange(rows),
+            FileName=BENCH_FILE_NAME,
+            BatchNumber=str(n),
+        )
+        db_manager.update_row(rejection)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    if reader_thread:
+        reader_thread.join()
+    return commits / elapsed, reads[0]
+
+
+def run(rows: int, commits: int) -> None:
+    per_row, columnar = time_materialize(rows)
+    print(f"Materialize {rows} rows: per-row {per_row:.2f}s, columnar {columnar:.2f}s ({per_row / columnar:.0f}x)")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for tuned in (False, True):
+            label = "tuned" if tuned else "default"
+            db_manager = DBManager(url=f"sqlite:///{Path(tmp) / f'{label}.db'}", tuned=tuned)
+            db_manager.create_db_and_tables()
+            ingest_seconds = seed(db_manager, rows)
+            results[label] = (
+                ingest_seconds,
+                time_commits(db_manager, rows, commits, with_reader=False),
+                time_commits(db_manager, rows, commits, with_reader=True),
+            )
+            db_manager.engine.dispose()
+
+    print(f"{rows} rows, {commits} single-row commits per measurement")
+    print(f"{'Profile':<10}{'Ingest s':>10}{'Commits/s':>12}{'Commits/s w/ reader':>22}{'Reader queries':>16}")
+    for label, (ingest_seconds, (alone, _), (shared, reads)) in results.items():
+        print(f"{label:<10}{ingest_seconds:>10.2f}{alone:>12.0f}{shared:>22.0f}{reads:>16}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000, help="Rows in the synthetic table")
+    parser.add_argument("--commits", type=int, default=2000, help="Single-row commits to time")
+    args = parser.parse_args()
+    run(args.rows, args.commits)
@@ -0,0 +1,95 @@
+"""Input file discovery on the network share in a single directory listing."""
+
+import fnmatch
+import os
+import re
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+
+def date_patterns(now: datetime) -> List[str]:
+    """Return the date formats input file names may contain for ``now``."""
+    patterns = [
+        now.strftime("%m_%d_%Y"),  # 01_05_2026
+        now.strftime("%m_%d_%y"),  # 01_05_26
+        now.strftime("%m.%d.%y"),  # 01.05.26
+        # Non-zero-padded variants for single-digit months/days, e.g. "1.5.26"
+        f"{now.month}.{now.day}.{now.strftime('%y')}",
+        f"{now.month}_{now.day}_{now.strftime('%y')}",
+    ]
+    # Padded and unpadded forms coincide on two-digit months and days
+    return list(dict.fromkeys(patterns))
+
+
+def build_matcher(now: datetime, name_override: str = '') -> re.Pattern:
+    """Compile one regex matching every CSV name the date patterns (or the override) select.
+
+    Matches the names the old ``*<pattern>*.csv`` globs did: case-insensitive,
+    hidden files excluded. The override is a glob fragment, as before, so it may
+    contain ``*``, ``?`` and ``[...]``.
+    """
+    if name_override:
+        return re.compile(rf"^(?!\.){fnmatch.translate(f'*{name_override}*.csv')}", re.IGNORECASE)
+    alternatives = "|".join(re.escape(fragment) for fragment in date_patterns(now))
+    return re.compile(rf"^(?!\.).*(?:{alternatives}).*\.csv$", re.IGNORECASE)
+
+
+class InputDiscovery:
+    """Finds input files with one ``os.scandir`` pass per poll.
+
+    The compiled matcher is reused until the date or override changes, and the
+    size and mtime of every matched file (which ``scandir`` returns with the
+    listing on Windows shares) are kept in ``signatures`` for change detection
+    without a further stat per file.
+    """
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        self.signatures: Dict[str, Tuple[int, float]] = {}
+        self._matcher_key: Optional[Tuple[str, str]] = None
+        self._matcher: Optional[re.Pattern] = None
+
+    def _get_matcher(self, now: datetime, name_override: str) -> re.Pattern:
+        key = (now.strftime("%Y-%m-%d"), name_override)
+        if key != self._matcher_key:
+            self._matcher = build_matcher(now, name_override)
+            self._matcher_key = key
+        return self._matcher  # type: ignore[return-value]
+
+    def scan(self, now: Optional[datetime] = None, name_override: Optional[str] = None) -> List[str]:
+        """List the input folder once and return the matching CSV paths, sorted and without duplicates.
+
+        Args:
+            now: Date to match (default: today)
+            name_override: Match this name fragment instead of the dates
+                (default: FILE_NAME_OVERRIDE env var)
+
+        Returns:
+            Paths of the matching files
+        """
+        if name_override is None:
+            name_override = os.getenv("FILE_NAME_OVERRIDE", "").strip()
+        matcher = self._get_matcher(now or datetime.now(), name_override)
+
+        signatures = {}
+        try:
+            with os.scandir(self.folder) as entries:
+                for entry in entries:
+                    if not matcher.match(entry.name):
+                        continue
+                    try:
+                        if not entry.is_file():
+                            continue
+                        stat = entry.stat()
+                    except OSError:
+                        # Removed or archived while listing
+                        continue
+                    signatures[os.path.join(self.folder, entry.name)] = (stat.st_size, stat.st_mtime)
+        except OSError as e:
+            logger.error(f"Could not list input folder {self.folder}: {e}")
+            return []
+
+        self.signatures = signatures
+        return sorted(signatures)
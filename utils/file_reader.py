@@ -1,41 +1,380 @@
-"""CSV file reader and processor for rejection data."""
+"""CSV file reader and processor for rejection data.
 
+Files are read with one of two engines: pandas, or the stdlib ``csv`` module for
+small files. pandas is only imported when the pandas engine is used.
+"""
+
+import csv
+import hashlib
+import os
 from pathlib import Path
-from typing import Dict, List
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
-import pandas as pd
 from loguru import logger
 
-from utils.database import ALLOWED_CARRIERS, DBManager, Rejections
+from utils.database import DBManager, IngestFingerprint, Rejections
+from utils.tracing import traced
+from utils.validation import ALLOWED_CARRIER_SET, apply_rules, apply_rules_to_rows
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 # Constants
 REQUIRED_COLUMNS = ['InvoiceNumber', 'Carrier', 'Paycode', 'LIPost', 'Group']
 INVOICE_NUMBER_MIN = 100000000
 INVOICE_NUMBER_MAX = 999999999
+INT_FIELDS = {'InvoiceNumber', 'Group'}
+BOOL_FIELDS = {'LineItemPost', 'Completed'}
+HASH_CHUNK_SIZE = 1024 * 1024
+# Text columns are read as strings so codes like 901 or 045 keep their exact form
+STRING_COLUMNS = {
+    'Carrier', 'Paycode', 'RejCode1', 'RejCode2', 'RejCode3', 'RejCode4',
+    'Remark1', 'Remark2', 'Remark3', 'Remark4', 'Comment', 'BatchNumber'
+}
+DEFAULT_CHUNK_ROWS = 50000
+STREAMING_THRESHOLD_BYTES = 50 * 1024 * 1024
+ENGINES = ('auto', 'csv', 'pandas')
+# Files with fewer data rows than this use the csv engine in auto mode
+CSV_ENGINE_MAX_ROWS = 5000
+# Booleans as pandas parses them
+TRUE_VALUES = {'True', 'TRUE', 'true'}
+FALSE_VALUES = {'False', 'FALSE', 'false'}
+
+
+def frame_to_records(data: "pd.DataFrame") -> Tuple[List[dict], List[Rejections]]:
+    """Convert formatted input data to database rows, column by column.
+    
+    Columns are matched to Rejections fields by alias or field name, as
+    ``Rejections.model_validate`` would. A row whose values already have the
+    field's type (9-digit integer invoice, integer group, real booleans, strings,
+    an allowed carrier) becomes a plain dict. Any other row is a suspect and goes
+    through ``Rejections.model_validate``, which coerces it or raises exactly
+    as before. Rows whose invoice number is not 9 digits are left out.
+    
+    Args:
+        data: Formatted and validated input data
+        
+    Returns:
+        Tuple of (column dicts for fast-path rows, validated Rejections for suspect rows)
+    """
+    import pandas as pd
+    
+    columns = {}
+    suspect = pd.Series(False, index=data.index)
+    invoice_numbers = None
+    
+    for name, field in Rejections.model_fields.items():
+        source = field.alias if field.alias in data.columns else name if name in data.columns else None
+        if source is None:
+            if field.is_required():
+                # Let pydantic report the missing field
+                suspect[:] = True
+            columns[name] = field.get_default(call_default_factory=True)
+            continue
+        
+        values = data[source]
+        if name in INT_FIELDS:
+            numbers = pd.to_numeric(values, errors='coerce')
+            is_number = values.map(lambda v: isinstance(v, (int, float)) and not isinstance(v, bool))
+            valid = is_number & numbers.notna() & (numbers == numbers.round())
+            values = numbers.where(valid, 0).astype('int64')
+            if name == 'InvoiceNumber':
+                invoice_numbers = values
+        elif name in BOOL_FIELDS:
+            valid = values.map(lambda v: isinstance(v, bool))
+        else:
+            valid = values.map(lambda v: isinstance(v, str) or v is None)
+            if name == 'Carrier':
+                valid &= values.isin(ALLOWED_CARRIER_SET) | values.isna()
+        suspect |= ~valid
+        columns[name] = values
+    
+    in_range = (
+        invoice_numbers.between(INVOICE_NUMBER_MIN, INVOICE_NUMBER_MAX)
+        if invoice_numbers is not None else pd.Series(False, index=data.index)
+    )
+    records = pd.DataFrame(columns, index=data.index).loc[~suspect & in_range].to_dict('records')
+    
+    validated = _validated_in_range(data.loc[suspect].to_dict('records'))
+    return records, validated
+
+
+def _validated_in_range(rows: List[dict]) -> List[Rejections]:
+    """Run full pydantic validation and keep rows with 9-digit invoice numbers."""
+    validated = [Rejections.model_validate(row) for row in rows]
+    return [
+        r for r in validated
+        if isinstance(r.InvoiceNumber, int)
+        and INVOICE_NUMBER_MIN <= r.InvoiceNumber <= INVOICE_NUMBER_MAX
+    ]
+
+
+def _parse_number(value: str) -> Any:
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def _parse_bool(value: str) -> Any:
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    # 0/1 flags are numbers to pandas, not strings
+    return _parse_number(value)
+
+
+def read_csv_rows(file_path: Path, file_name: str) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """Read and format an input file with the stdlib ``csv`` module.
+    
+    Applies the same normalization as ``InputFile.format_data``: spaces removed from
+    column names, ``Column*`` columns dropped, empty cells as '', text columns kept
+    as strings, numbers and booleans parsed as pandas would, Completed as a boolean,
+    upper-case carriers and the FileName column.
+    
+    Args:
+        file_path: Path to the CSV file
+        file_name: File name stored with each row
+        
+    Returns:
+        Tuple of (column names, formatted rows)
+    """
+    with open(file_path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        
+        # Column layout is resolved once; each row is then a straight index lookup
+        layout = []
+        for index, raw_name in enumerate(header):
+            name = raw_name.replace(' ', '')
+            if name.lower().startswith('column'):
+                continue
+            if name in STRING_COLUMNS:
+                convert = str
+            elif name in ('LIPost', 'LineItemPost', 'Completed'):
+                convert = _parse_bool
+            else:
+                convert = _parse_number
+            layout.append((index, name, convert))
+        
+        rows = []
+        for values in reader:
+            if not values:
+                continue
+            row = {}
+            for index, name, convert in layout:
+                value = values[index] if index < len(values) else ''
+                row[name] = convert(value) if value != '' else ''
+            rows.append(row)
+    
+    columns = [name for _, name, _ in layout]
+    for row in rows:
+        # Same truthiness as the pandas engine's astype(bool): '' and 0 are False
+        row['Completed'] = bool(row.get('Completed', False))
+        row['Carrier'] = row.get('Carrier', '').upper()
+        row['FileName'] = file_name
+    for name in ('Completed', 'FileName'):
+        if name not in columns:
+            columns.append(name)
+    return columns, rows
+
+
+def rows_to_records(rows: List[Dict[str, Any]]) -> List[dict]:
+    """Convert formatted rows from ``read_csv_rows`` to database rows.
+    
+    Row-wise counterpart of ``frame_to_records``: rows whose values already have the
+    field types become plain dicts, anything else goes through ``Rejections.model_validate``.
+    
+    Args:
+        rows: Formatted and validated rows
+        
+    Returns:
+        Database rows as plain dicts; rows whose invoice number is not 9 digits are left out
+    """
+    if not rows:
+        return []
+    
+    # Rows share one set of keys, so resolve each field's source column once
+    fields = []
+    for name, field in Rejections.model_fields.items():
+        source = field.alias if field.alias in rows[0] else name if name in rows[0] else None
+        fields.append((name, source, field.is_required(), field.get_default(call_default_factory=True)))
+    
+    records, suspects = [], []
+    for row in rows:
+        record = {}
+        suspect = False
+        for name, source, required, default in fields:
+            if source is None:
+                suspect = suspect or required
+                record[name] = default
+                continue
+            value = row[source]
+            if name in INT_FIELDS:
+                if isinstance(value, (int, float)) and not isinstance(value, bool) and float(value).is_integer():
+                    value = int(value)
+                else:
+                    suspect = True
+            elif name in BOOL_FIELDS:
+                suspect = suspect or not isinstance(value, bool)
+            elif not (isinstance(value, str) or value is None) or \
+                    (name == 'Carrier' and value is not None and value not in ALLOWED_CARRIER_SET):
+                suspect = True
+            record[name] = value
+        if suspect:
+            suspects.append(row)
+        elif INVOICE_NUMBER_MIN <= record['InvoiceNumber'] <= INVOICE_NUMBER_MAX:
+            records.append(record)
+    
+    if suspects:
+        logger.debug(f"{len(suspects)} rows needed full validation")
+    return records + [r.model_dump(by_alias=False) for r in _validated_in_range(suspects)]
 
 
 class InputFile:
     """Reads and processes rejection CSV files for database storage."""
     
-    def __init__(self, file_path: str, db_manager: DBManager):
+    def __init__(
+        self,
+        file_path: str,
+        db_manager: Optional[DBManager],
+        chunk_rows: Optional[int] = None,
+        ingest: bool = True,
+        engine: Optional[str] = None
+    ):
         """Initialize InputFile processor.
         
         Args:
             file_path: Path to the CSV file to process
-            db_manager: Database manager instance for persistence
+            db_manager: Database manager instance for persistence (None for parse-only use)
+            chunk_rows: Stream the file in chunks of this many rows (0 loads it whole).
+                Default: INGEST_CHUNK_ROWS env var, else streaming only for files
+                over STREAMING_THRESHOLD_BYTES
+            ingest: Ingest the file and load its pending work right away
+            engine: 'csv', 'pandas' or 'auto' (csv below CSV_ENGINE_MAX_ROWS rows, never
+                when streaming). Default: INGEST_ENGINE env var or 'auto'
         """
         self.file_path = Path(file_path)
         self.file_name = self.file_path.name
         self.db_manager = db_manager
-        self.data: pd.DataFrame = pd.DataFrame()
+        if chunk_rows is None:
+            if os.getenv("INGEST_CHUNK_ROWS"):
+                chunk_rows = int(os.getenv("INGEST_CHUNK_ROWS", ""))
+            elif self.file_path.stat().st_size > STREAMING_THRESHOLD_BYTES:
+                chunk_rows = DEFAULT_CHUNK_ROWS
+            else:
+                chunk_rows = 0
+        self.chunk_rows = chunk_rows
+        self.engine = engine or os.getenv("INGEST_ENGINE", "auto").strip().lower()
+        if self.engine not in ENGINES:
+            raise ValueError(f"Unknown ingest engine {self.engine!r}, expected one of {ENGINES}")
+        self.data: Optional["pd.DataFrame"] = None
+        self.columns: List[str] = []
+        self.rows: List[Dict[str, Any]] = []
         self.group_data: Dict[int, List[Rejections]] = {3: [], 4: [], 5: [], 6: []}
         
-        self.load_data()
-        self.write_data_to_database()
+        if ingest:
+            self.ingest()
+            self.filter_by_group()
+    
+    def _fingerprint(self, stored: Optional[IngestFingerprint]) -> Tuple[IngestFingerprint, bool]:
+        """Fingerprint the file and compare it with the stored fingerprint.
+        
+        The content hash is only computed when size or mtime differ from the stored values.
+        
+        Returns:
+            Tuple of (current fingerprint, whether the file is unchanged)
+        """
+        stat = self.file_path.stat()
+        if stored is not None and stored.Size == stat.st_size and stored.MTime == stat.st_mtime:
+            return stored, True
+        
+        digest = hashlib.sha256()
+        with open(self.file_path, 'rb') as f:
+            for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(block)
+        fingerprint = IngestFingerprint(
+            FilePath=str(self.file_path.resolve()),
+            FileName=self.file_name,
+            Size=stat.st_size,
+            MTime=stat.st_mtime,
+            ContentHash=digest.hexdigest(),
+        )
+        unchanged = stored is not None and stored.ContentHash == fingerprint.ContentHash
+        return fingerprint, unchanged
+    
+    def changed_fingerprint(self) -> Optional[IngestFingerprint]:
+        """Return the file's new fingerprint if it changed since its last ingest.
+        
+        Returns:
+            Fingerprint to store once the file is ingested, or None if the file is unchanged
+        """
+        stored = self.db_manager.get_fingerprint(str(self.file_path.resolve()))
+        fingerprint, unchanged = self._fingerprint(stored)
+        if not unchanged:
+            return fingerprint
+        
+        if stored is not None and stored.MTime != fingerprint.MTime:
+            # Same content, touched file; remember the new mtime to skip hashing next time
+            stored.MTime = fingerprint.MTime
+            self.db_manager.set_fingerprint(stored)
+        logger.info(f"{self.file_name} unchanged since last ingest, skipping parse")
+        return None
+    
+    def ingest(self) -> None:
+        """Parse, validate and store the file, unless it is unchanged since its last ingest."""
+        fingerprint = self.changed_fingerprint()
+        if fingerprint is None:
+            return
+        
+        if self.chunk_rows:
+            fingerprint.Rows = self.stream_to_database()
+        else:
+            self.load_data()
+            fingerprint.Rows = self.write_data_to_database()
+        self.db_manager.set_fingerprint(fingerprint)
+    
+    def _count_rows(self, limit: int) -> int:
+        """Count data rows (lines after the header), stopping once ``limit`` is reached."""
+        lines = 0
+        with open(self.file_path, 'rb') as f:
+            for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                lines += block.count(b'\n')
+                if lines > limit:
+                    break
+        return max(lines - 1, 0)
+    
+    def _resolve_engine(self) -> str:
+        """Pick the engine for this file, resolving 'auto'."""
+        if self.chunk_rows:
+            return 'pandas'
+        if self.engine != 'auto':
+            return self.engine
+        return 'csv' if self._count_rows(CSV_ENGINE_MAX_ROWS) < CSV_ENGINE_MAX_ROWS else 'pandas'
+    
+    def _read_options(self) -> dict:
+        """Build ``pd.read_csv`` options from the file header.
+        
+        Skips the spreadsheet's ``Column*`` filler columns at read time and reads
+        text columns as strings.
+        """
+        import pandas as pd
+        
+        header = pd.read_csv(self.file_path, nrows=0).columns
+        usecols = [c for c in header if not c.replace(' ', '').lower().startswith('column')]
+        dtype = {c: str for c in usecols if c.replace(' ', '') in STRING_COLUMNS}
+        return {'usecols': usecols, 'dtype': dtype}
 
     def format_data(self) -> None:
         """Format and normalize CSV data for processing."""
-        data = self.data.copy()
+        import pandas as pd
+        
+        data = self.data
         
         # Remove leading and trailing spaces from column names
         data.columns = data.columns.str.replace(' ', '')
@@ -52,106 +391,116 @@ class InputFile:
         
         data['FileName'] = self.file_name
         
+        # Drop any columns that have the name "Column" in them
+        data = data.loc[:, ~data.columns.str.contains('^Column', case=False)]
+        
+        # Normalize carrier values to uppercase
+        data['Carrier'] = data['Carrier'].str.upper()
+        
         self.data = data
     
     def filter_by_group(self) -> None:
-        """Filter data by group number and populate group_data dictionary."""
-        if self.data.empty:
-            logger.error("Data not loaded. Call load_data() first.")
-            return
-        
+        """Load the file's pending work from the database into the group_data dictionary."""
+        pending = self.db_manager.get_pending_work(self.file_name)
         for group_number in self.group_data.keys():
-            results = self.db_manager.get_unposted_invoices(self.file_name, group_number)
+            results = pending.get(group_number, [])
             self.group_data[group_number] = results
             logger.info(f"Filtered data for group {group_number}, {len(results)} records found.")
     
     def validate_data(self) -> bool:
-        """Validate data integrity and business rules.
+        """Validate data integrity and business rules (see ``utils.validation.RULES``).
         
         Returns:
             True if validation passes, False otherwise
         """
         # Ensure necessary columns exist
-        missing_cols = [col for col in REQUIRED_COLUMNS if col not in self.data.columns]
+        columns = self.columns if self.data is None else list(self.data.columns)
+        missing_cols = [col for col in REQUIRED_COLUMNS if col not in columns]
         if missing_cols:
             logger.error(f"Missing required columns: {missing_cols}")
             return False
         
-        rows_to_drop = []
-        
-        for idx, row in self.data.iterrows():
-            # If Paycode is 901, ensure LIPost is false
-            if row['Paycode'] == '901' and row['LIPost']:
-                logger.warning(
-                    f"Paycode is 901 but LIPost is True for InvoiceNumber: {row['InvoiceNumber']}. "
-                    "Setting LIPost to False."
-                )
-                self.data.at[idx, 'LIPost'] = False  # type: ignore[call-overload]
-            
-            # If LIPost is true, ensure Carrier value is not empty
-            if row['LIPost'] and not row['Carrier']:
-                logger.error(
-                    f"LIPost is True but Carrier is empty for InvoiceNumber: {row['InvoiceNumber']}. "
-                    "Removing row."
-                )
-                rows_to_drop.append(idx)
-                continue
-            
-            # Validate carrier against allowed list
-            if row['Carrier'] and row['Carrier'] not in ALLOWED_CARRIERS:
-                logger.error(
-                    f"Invalid Carrier value: {row['Carrier']} for InvoiceNumber: {row['InvoiceNumber']}. "
-                    "Removing row."
-                )
-                rows_to_drop.append(idx)
-        
-        # Drop invalid rows
-        if rows_to_drop:
-            self.data = self.data.drop(rows_to_drop)
-            logger.warning(f"Dropped {len(rows_to_drop)} invalid rows during validation")
+        if self.data is None:
+            self.rows, dropped = apply_rules_to_rows(self.rows)
+        else:
+            self.data, dropped = apply_rules(self.data)
+        if dropped:
+            logger.warning(f"Dropped {dropped} invalid rows during validation")
         
         return True
     
+    @traced("load_data")
     def load_data(self) -> None:
         """Load and process CSV file data."""
         try:
-            self.data = pd.read_csv(self.file_path)
-            logger.info(f"Loaded data from {self.file_path}")
-            
-            self.format_data()
-            
-            # Drop any columns that have the name "Column" in them
-            self.data = self.data.loc[:, ~self.data.columns.str.contains('^Column', case=False)]
-            
-            # Normalize carrier values to uppercase
-            self.data['Carrier'] = self.data['Carrier'].str.upper()
+            if self._resolve_engine() == 'csv':
+                self.data = None
+                self.columns, self.rows = read_csv_rows(self.file_path, self.file_name)
+                logger.info(f"Loaded data from {self.file_path} (csv engine)")
+            else:
+                import pandas as pd
+                
+                self.data = pd.read_csv(self.file_path, **self._read_options())
+                logger.info(f"Loaded data from {self.file_path}")
+                self.format_data()
             
             self.validate_data()
-            self.filter_by_group()
 
         except Exception as e:
             logger.error(f"Error loading data from {self.file_path}: {e}")
             raise
     
-    def write_data_to_database(self) -> None:
-        """Convert dataframe rows to Rejections objects and write to database."""
-        rejections_list = [
-            Rejections.model_validate(row.to_dict())
-            for _, row in self.data.iterrows()
-        ]
+    def to_records(self) -> List[dict]:
+        """Convert the loaded data to database rows as plain dicts."""
+        if self.data is None:
+            return rows_to_records(self.rows)
+        records, validated = frame_to_records(self.data)
+        if validated:
+            logger.debug(f"{len(validated)} rows needed full validation")
+        return records + [r.model_dump(by_alias=False) for r in validated]
+    
+    def write_data_to_database(self) -> int:
+        """Convert dataframe rows to database rows and write them to the database.
         
-        # Filter out invalid invoice numbers (must be 9 digits)
-        rejections_list = [
-            r for r in rejections_list
-            if isinstance(r.InvoiceNumber, int) 
-            and INVOICE_NUMBER_MIN <= r.InvoiceNumber <= INVOICE_NUMBER_MAX
-        ]
+        Returns:
+            Number of valid rows in the file
+        """
+        # Invoice numbers outside the 9-digit range are left out
+        rejections_list = self.to_records()
         
         if rejections_list:
-            self.db_manager.add_rejections(rejections_list)
-            logger.info(f"Added {len(rejections_list)} rejections to database")
+            inserted, skipped = self.db_manager.add_rejections(rejections_list)
+            logger.info(f"Added {inserted} rejections to database, {skipped} already present")
         else:
             logger.warning("No valid rejections to add to database")
+        return len(rejections_list)
+    
+    @traced("stream_to_database")
+    def stream_to_database(self) -> int:
+        """Read, validate and store the file one chunk at a time, keeping memory flat.
+        
+        Returns:
+            Number of valid rows in the file
+        """
+        import pandas as pd
+        
+        rows = 0
+        try:
+            with pd.read_csv(self.file_path, chunksize=self.chunk_rows, **self._read_options()) as reader:
+                for chunk_number, chunk in enumerate(reader, start=1):
+                    self.data = chunk
+                    self.format_data()
+                    self.validate_data()
+                    rows += self.write_data_to_database()
+                    logger.debug(f"Stored chunk {chunk_number} of {self.file_name} ({rows} valid rows so far)")
+        except Exception as e:
+            logger.error(f"Error streaming data from {self.file_path}: {e}")
+            raise
+        finally:
+            self.data = None
+        
+        logger.info(f"Streamed {rows} valid rows from {self.file_path}")
+        return rows
     
     def update_row(self, rejection: Rejections) -> None:
         """Update a rejection record in the database.
@@ -160,3 +509,19 @@ class InputFile:
             rejection: Rejection record to update
         """
         self.db_manager.update_row(rejection)
+
+
+def parse_file(file_path: str) -> List[dict]:
+    """Load, validate and convert an input file to database rows without a database.
+    
+    Used by the ingest process pool; the rows are stored by the parent process.
+    
+    Args:
+        file_path: Path to the CSV file
+        
+    Returns:
+        Database rows as plain dicts
+    """
+    input_file = InputFile(file_path, db_manager=None, chunk_rows=0, ingest=False)
+    input_file.load_data()
+    return input_file.to_records()
@@ -0,0 +1,114 @@
+"""Parallel ingest of input files ahead of posting."""
+
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from utils.database import DBManager, IngestFingerprint
+from utils.file_reader import InputFile, parse_file
+from utils.tracing import traced
+
+
+# Log records captured in a pool worker process, as (level name, message)
+_worker_messages: List[Tuple[str, str]] = []
+
+
+def _init_worker() -> None:
+    """Pool initializer: capture log records instead of writing them from the child.
+
+    The run's file sinks live in the parent process; a child either has none
+    (spawn) or shares their file handles (fork), so its records are collected
+    here and logged by the parent.
+    """
+    logger.remove()
+    logger.add(lambda message: _worker_messages.append(
+        (message.record['level'].name, message.record['message'])
+    ), level="DEBUG")
+
+
+def _parse_in_worker(file_path: str) -> Tuple[Optional[List[dict]], List[Tuple[str, str]], Optional[str]]:
+    """Parse a file in a pool worker.
+
+    Returns:
+        Tuple of (rows or None on failure, captured log records, error message or None)
+    """
+    _worker_messages.clear()
+    try:
+        return parse_file(file_path), list(_worker_messages), None
+    except Exception as e:
+        return None, list(_worker_messages), str(e)
+
+
+@traced("ingest_files")
+def ingest_files(file_paths: List[str], db_manager: DBManager, processes: Optional[int] = None) -> Dict[str, int]:
+    """Parse every new or changed input file in worker processes and store the rows.
+
+    Parsing and validation (the pandas work) run in a process pool; this thread is
+    the only database writer and stores each file's rows and fingerprint as soon as
+    its parse finishes. Unchanged files are skipped, and files large enough to be
+    streamed are left to ``InputFile`` so their memory stays bounded. A file that
+    fails to parse here is left for ``InputFile`` too, which reports the error as before.
+
+    Args:
+        file_paths: Input files to ingest
+        db_manager: Database manager used for fingerprints and inserts
+        processes: Worker processes (default: INGEST_PROCESSES env var or the CPU count)
+
+    Returns:
+        Dict of file path to number of rows stored
+    """
+    pending: Dict[str, IngestFingerprint] = {}
+    for file_path in file_paths:
+        input_file = InputFile(file_path, db_manager, ingest=False)
+        if input_file.chunk_rows:
+            continue
+        fingerprint = input_file.changed_fingerprint()
+        if fingerprint is not None:
+            pending[file_path] = fingerprint
+    if not pending:
+        return {}
+
+    if processes is None:
+        processes = int(os.getenv("INGEST_PROCESSES", "0")) or os.cpu_count() or 1
+    processes = min(processes, len(pending))
+    logger.info(f"Ingesting {len(pending)} file(s) in {processes} process(es)")
+
+    stored = {}
+
+    def store(file_path: str, records: List[dict]) -> None:
+        inserted, skipped = db_manager.add_rejections(records)
+        fingerprint = pending[file_path]
+        fingerprint.Rows = len(records)
+        db_manager.set_fingerprint(fingerprint)
+        stored[file_path] = len(records)
+        logger.info(f"Ingested {os.path.basename(file_path)}: {inserted} new rows, {skipped} already present")
+
+    if processes == 1:
+        # Not worth starting a pool for a single file
+        for file_path in pending:
+            try:
+                records = parse_file(file_path)
+            except Exception as e:
+                logger.error(f"Ingest of {file_path} failed: {e}")
+                continue
+            store(file_path, records)
+        return stored
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker) as pool:
+        futures = {pool.submit(_parse_in_worker, file_path): file_path for file_path in pending}
+        for future in as_completed(futures):
+            file_path = futures[future]
+            try:
+                records, messages, error = future.result()
+            except Exception as e:
+                logger.error(f"Ingest of {file_path} failed in worker process: {e}")
+                continue
+            for level, message in messages:
+                logger.log(level, message)
+            if error is not None:
+                logger.error(f"Ingest of {file_path} failed in worker process: {error}")
+                continue
+            store(file_path, records)
+    return stored
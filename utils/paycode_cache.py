@@ -0,0 +1,99 @@
+"""Session-persistent cache of paycodes resolved from the Payment Codes modal."""
+
+import os
+import threading
+from datetime import timedelta
+from typing import Dict, Optional
+
+from loguru import logger
+
+from utils.database import DBManager
+
+# Constants
+DEFAULT_TTL_HOURS = 24
+
+
+class PaycodeCache:
+    """Caches the MANUAL paycode per group in the SQLite DB.
+
+    The Payment Codes modal lists the same MANUAL paycode for every carrier in a
+    group, so entries are keyed by group alone. Entries older than the TTL are
+    treated as misses. Hits are also kept in memory so repeated lookups in a run
+    don't touch the database.
+    """
+
+    def __init__(self, db_manager: DBManager, ttl_hours: Optional[float] = None):
+        """Initialize the paycode cache.
+
+        Args:
+            db_manager: Database manager used for persistence
+            ttl_hours: Entry lifetime in hours (default: PAYCODE_CACHE_TTL_HOURS env var or 24)
+        """
+        if ttl_hours is None:
+            ttl_hours = float(os.getenv("PAYCODE_CACHE_TTL_HOURS", DEFAULT_TTL_HOURS))
+        self.db_manager = db_manager
+        self.ttl = timedelta(hours=ttl_hours)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._memory: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def get(self, group: int) -> Optional[str]:
+        """Look up the cached paycode for a group.
+
+        Args:
+            group: Group number
+
+        Returns:
+            The cached paycode, or None on a miss
+        """
+        with self._lock:
+            paycode = self._memory.get(group)
+        if paycode is None:
+            paycode = self.db_manager.get_cached_paycode(group, max_age=self.ttl)
+        if paycode:
+            with self._lock:
+                self._memory[group] = paycode
+                self.hits += 1
+            logger.debug(f"Paycode cache hit for group {group}: {paycode}")
+            return paycode
+
+        with self._lock:
+            self.misses += 1
+        logger.debug(f"Paycode cache miss for group {group}")
+        return None
+
+    def put(self, group: int, paycode: str) -> None:
+        """Cache a paycode for a group.
+
+        Args:
+            group: Group number
+            paycode: Paycode resolved from the Payment Codes modal
+        """
+        with self._lock:
+            self._memory[group] = paycode
+        self.db_manager.set_cached_paycode(group, paycode)
+
+    def invalidate(self, group: int) -> None:
+        """Drop a group's cached paycode after IDX rejected it.
+
+        Args:
+            group: Group number
+        """
+        with self._lock:
+            self.invalidations += 1
+            self._memory.pop(group, None)
+        self.db_manager.delete_cached_paycode(group)
+        logger.info(f"Invalidated cached paycode for group {group}")
+
+    def stats(self) -> dict:
+        """Return hit/miss counters for reporting."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,146 @@
+"""Local staging of input files from the network share, and background archiving."""
+
+import hashlib
+import os
+import queue
+import shutil
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from loguru import logger
+
+# Constants
+DEFAULT_STAGING_DIR = "staging"
+COPY_CHUNK_SIZE = 1024 * 1024
+MAX_COPY_ATTEMPTS = 3
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(COPY_CHUNK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class StagingArea:
+    """Copies input files to a local work directory so parsing runs at local-disk speed.
+
+    Each file is copied to a ``.partial`` name while hashing the bytes read from the
+    share. It is renamed into place only if the local copy hashes the same and the
+    source did not change during the copy. The copy keeps the source's mtime, so an
+    unchanged file is not copied again on the next run.
+    """
+
+    def __init__(self, staging_dir: Optional[str] = None):
+        """Initialize the staging area.
+
+        Args:
+            staging_dir: Local work directory (default: STAGING_DIR env var or ./staging)
+        """
+        self.dir = Path(staging_dir or os.getenv("STAGING_DIR", DEFAULT_STAGING_DIR))
+        self.dir.mkdir(parents=True, exist_ok=True)
+
+    def local_path(self, source_path: str) -> Path:
+        return self.dir / Path(source_path).name
+
+    def stage(self, source_path: str) -> str:
+        """Copy a file from the share into the staging directory.
+
+        Args:
+            source_path: Path of the file on the share
+
+        Returns:
+            Path of the verified local copy, or ``source_path`` if it could not be staged
+        """
+        local = self.local_path(source_path)
+        partial = local.with_name(local.name + '.partial')
+        try:
+            source_stat = os.stat(source_path)
+            if local.exists():
+                local_stat = local.stat()
+                if local_stat.st_size == source_stat.st_size and local_stat.st_mtime == source_stat.st_mtime:
+                    return str(local)
+
+            for attempt in range(1, MAX_COPY_ATTEMPTS + 1):
+                digest = hashlib.sha256()
+                with open(source_path, 'rb') as fsrc, open(partial, 'wb') as fdst:
+                    for block in iter(lambda: fsrc.read(COPY_CHUNK_SIZE), b''):
+                        digest.update(block)
+                        fdst.write(block)
+                shutil.copystat(source_path, partial)
+
+                after = os.stat(source_path)
+                unchanged = (after.st_size, after.st_mtime) == (source_stat.st_size, source_stat.st_mtime)
+                if unchanged and _sha256(partial) == digest.hexdigest():
+                    os.replace(partial, local)
+                    logger.debug(f"Staged {source_path} to {local}")
+                    return str(local)
+
+                logger.warning(f"Staged copy of {source_path} did not verify (attempt {attempt}), retrying")
+                source_stat = after
+        except OSError as e:
+            logger.warning(f"Could not stage {source_path}: {e}")
+        finally:
+            partial.unlink(missing_ok=True)
+
+        logger.warning(f"Reading {source_path} directly from the share")
+        return source_path
+
+    def remove(self, source_path: str) -> None:
+        """Delete the local copy of a file once it is archived."""
+        self.local_path(source_path).unlink(missing_ok=True)
+
+
+class ArchiveMover:
+    """Moves completed input files into their archive folder from a background thread.
+
+    ``add`` only records a move; ``flush`` hands the recorded moves to the thread as
+    one batch, and ``close`` flushes and waits for every move to finish.
+    """
+
+    def __init__(self, staging: Optional[StagingArea] = None):
+        """Initialize the archive mover.
+
+        Args:
+            staging: Staging area whose local copies are deleted once archived
+        """
+        self.staging = staging
+        self._pending: List[Tuple[str, Path]] = []
+        self._batches: "queue.Queue[Optional[List[Tuple[str, Path]]]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="archiver", daemon=True)
+        self._thread.start()
+
+    def add(self, source_path: str, archive_dir: Path) -> None:
+        """Record a file to move into ``archive_dir`` on the next flush."""
+        self._pending.append((source_path, archive_dir))
+
+    def flush(self) -> None:
+        """Start moving every recorded file in the background."""
+        if self._pending:
+            self._batches.put(self._pending)
+            self._pending = []
+
+    def close(self) -> None:
+        """Flush and wait until every move is done."""
+        self.flush()
+        self._batches.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            batch = self._batches.get()
+            if batch is None:
+                return
+            for source_path, archive_dir in batch:
+                file_name = os.path.basename(source_path)
+                try:
+                    archive_dir.mkdir(exist_ok=True)
+                    shutil.move(source_path, archive_dir / file_name)
+                except OSError as e:
+                    logger.error(f"Failed to archive {file_name}: {e}")
+                    continue
+                if self.staging is not None:
+                    self.staging.remove(source_path)
+                logger.info(f"Archived {file_name} to {archive_dir} (all groups completed)")
@@ -0,0 +1,176 @@
+"""Hierarchical timing spans for the posting pipeline, written as JSON lines next to the logs.
+
+Usage:
+    with span("paycode_resolve", invoice=123456789):
+        ...
+
+    @traced("open_batch")
+    def open_batch(self): ...
+
+Turn a run's spans into per-stage latency percentiles with:
+    python -m utils.tracing <log folder or spans.jsonl>
+"""
+
+import functools
+import itertools
+import json
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+# Constants
+SPANS_FILE_NAME = "spans.jsonl"
+PERCENTILES = (50, 95, 99)
+
+_current_span: ContextVar[Optional[int]] = ContextVar("current_span", default=None)
+_span_ids = itertools.count(1)
+_sink_lock = threading.Lock()
+_sink = None
+
+
+def configure_tracing(log_folder_path: Path) -> Path:
+    """Start writing spans to ``spans.jsonl`` in the run's log folder.
+
+    Args:
+        log_folder_path: The run's log folder
+
+    Returns:
+        Path of the spans file
+    """
+    global _sink
+    path = Path(log_folder_path) / SPANS_FILE_NAME
+    with _sink_lock:
+        if _sink is not None:
+            _sink.close()
+        _sink = open(path, "a", encoding="utf-8", buffering=1)
+    logger.debug(f"Writing timing spans to {path}")
+    return path
+
+
+def close_tracing() -> None:
+    """Flush and close the spans file."""
+    global _sink
+    with _sink_lock:
+        if _sink is not None:
+            _sink.close()
+            _sink = None
+
+
+def _write(record: dict) -> None:
+    line = json.dumps(record, separators=(",", ":"), default=str)
+    with _sink_lock:
+        if _sink is not None:
+            _sink.write(line + "\n")
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time a block as a span nested under the current span of this thread.
+
+    Spans are only written once ``configure_tracing`` has been called; otherwise
+    they cost a couple of clock reads.
+
+    Args:
+        name: Stage name used for reporting
+        **attributes: Extra fields stored with the span (e.g. invoice number)
+    """
+    span_id = next(_span_ids)
+    parent_id = _current_span.get()
+    token = _current_span.set(span_id)
+    started_at = time.time()
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        _current_span.reset(token)
+        record = {
+            "name": name,
+            "id": span_id,
+            "parent": parent_id,
+            "ts": round(started_at, 3),
+            "ms": round((time.perf_counter() - start) * 1000, 2),
+            "thread": threading.current_thread().name,
+        }
+        if error:
+            record["error"] = error
+        record.update(attributes)
+        _write(record)
+
+
+def traced(name: Optional[str] = None):
+    """Decorator that wraps every call of a function in a span.
+
+    Args:
+        name: Span name (default: the function's qualified name)
+    """
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _percentile(sorted_values: List[float], percentile: int) -> float:
+    # Nearest-rank percentile
+    rank = max(1, -(-len(sorted_values) * percentile // 100))
+    return sorted_values[rank - 1]
+
+
+def report(spans_path: Path) -> Dict[str, dict]:
+    """Summarize a spans file into per-stage count, total and latency percentiles.
+
+    Args:
+        spans_path: A ``spans.jsonl`` file, or a log folder containing one
+
+    Returns:
+        Dict of stage name to ``{"count", "total_s", "p50", "p95", "p99"}`` (milliseconds)
+    """
+    spans_path = Path(spans_path)
+    if spans_path.is_dir():
+        spans_path = spans_path / SPANS_FILE_NAME
+
+    durations: Dict[str, List[float]] = defaultdict(list)
+    with open(spans_path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                durations[record["name"]].append(record["ms"])
+
+    summary = {}
+    for name, values in durations.items():
+        values.sort()
+        summary[name] = {
+            "count": len(values),
+            "total_s": sum(values) / 1000,
+            **{f"p{p}": _percentile(values, p) for p in PERCENTILES},
+        }
+    return summary
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python -m utils.tracing <log folder or spans.jsonl>")
+        sys.exit(1)
+
+    stats = report(Path(sys.argv[1]))
+    print(f"{'Stage':<24}{'Count':>8}{'Total s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, row in sorted(stats.items(), key=lambda item: -item[1]["total_s"]):
+        print(
+            f"{stage:<24}{row['count']:>8}{row['total_s']:>10.1f}"
+            f"{row['p50']:>10.0f}{row['p95']:>10.0f}{row['p99']:>10.0f}"
+        )
@@ -0,0 +1,157 @@
+"""Business-rule validation for rejection input data.
+
+Every rule has a vectorized form for pandas DataFrames and a per-row form for the
+stdlib ``csv`` engine; both are applied with the same semantics.
+"""
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from utils.database import ALLOWED_CARRIERS
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Constants
+ALLOWED_CARRIER_SET = frozenset(ALLOWED_CARRIERS)
+
+
+@dataclass(frozen=True)
+class Rule:
+    """A validation rule applied to the whole DataFrame at once, or row by row.
+
+    ``mask`` returns a boolean Series marking the offending rows and ``row_check``
+    tests a single row dict the same way. Drop rules remove those rows; fix rules
+    call ``fix(data, mask)`` / ``row_fix(row)`` to repair them in place. ``message``
+    is logged once per rule (or once per distinct ``group_by`` value) with the
+    offending invoice numbers substituted for ``{invoices}`` and the group value
+    for ``{value}``.
+    """
+    name: str
+    mask: Callable[["pd.DataFrame"], "pd.Series"]
+    row_check: Callable[[Dict[str, Any]], bool]
+    message: str
+    drop: bool = True
+    fix: Optional[Callable[["pd.DataFrame", "pd.Series"], None]] = None
+    row_fix: Optional[Callable[[Dict[str, Any]], None]] = None
+    level: str = "ERROR"
+    group_by: Optional[str] = None
+
+
+def _set_lipost_false(data: "pd.DataFrame", mask: "pd.Series") -> None:
+    # 0/1 flags are read as int64; cast before writing a bool into the column
+    data['LIPost'] = data['LIPost'].astype(bool)
+    data.loc[mask, 'LIPost'] = False
+
+
+def _set_row_lipost_false(row: Dict[str, Any]) -> None:
+    row['LIPost'] = False
+
+
+# Masks read the data as loaded; a row dropped by an earlier rule is not reported again
+RULES: List[Rule] = [
+    Rule(
+        name="paycode_901_lipost",
+        mask=lambda d: (d['Paycode'] == '901') & d['LIPost'].astype(bool),
+        row_check=lambda r: r['Paycode'] == '901' and bool(r['LIPost']),
+        message="Paycode is 901 but LIPost is True for InvoiceNumber: {invoices}. Setting LIPost to False.",
+        drop=False,
+        fix=_set_lipost_false,
+        row_fix=_set_row_lipost_false,
+        level="WARNING",
+    ),
+    Rule(
+        name="lipost_without_carrier",
+        mask=lambda d: d['LIPost'].astype(bool) & ~d['Carrier'].astype(bool),
+        row_check=lambda r: bool(r['LIPost']) and not r['Carrier'],
+        message="LIPost is True but Carrier is empty for InvoiceNumber: {invoices}. Removing row.",
+    ),
+    Rule(
+        name="carrier_not_allowed",
+        mask=lambda d: d['Carrier'].astype(bool) & ~d['Carrier'].isin(ALLOWED_CARRIER_SET),
+        row_check=lambda r: bool(r['Carrier']) and r['Carrier'] not in ALLOWED_CARRIER_SET,
+        message="Invalid Carrier value: {value} for InvoiceNumber: {invoices}. Removing row.",
+        group_by='Carrier',
+    ),
+]
+
+
+def _log(rule: Rule, groups: Dict[Any, List[Any]]) -> None:
+    for value, invoices in groups.items():
+        invoice_list = ", ".join(str(invoice) for invoice in invoices)
+        logger.log(rule.level, rule.message.format(invoices=invoice_list, value=value))
+
+
+def apply_rules(data: "pd.DataFrame", rules: List[Rule] = RULES) -> Tuple["pd.DataFrame", int]:
+    """Evaluate every rule on ``data``, apply fixes and drop offending rows in one step.
+
+    Args:
+        data: Formatted input data
+        rules: Rules to apply, in order
+
+    Returns:
+        Tuple of (validated data, number of dropped rows)
+    """
+    import pandas as pd
+
+    dropped = pd.Series(False, index=data.index)
+    fixes = []
+    for rule in rules:
+        hits = rule.mask(data).fillna(False).astype(bool) & ~dropped
+        if not hits.any():
+            continue
+        offending = data.loc[hits]
+        if rule.group_by is None:
+            _log(rule, {None: offending['InvoiceNumber'].tolist()})
+        else:
+            _log(rule, {
+                value: rows['InvoiceNumber'].tolist()
+                for value, rows in offending.groupby(rule.group_by, sort=False, dropna=False)
+            })
+        if rule.drop:
+            dropped |= hits
+        if rule.fix is not None:
+            fixes.append((rule.fix, hits))
+
+    result = data.copy() if fixes else data
+    for fix, hits in fixes:
+        fix(result, hits)
+    if dropped.any():
+        result = result.loc[~dropped]
+    return result, int(dropped.sum())
+
+
+def apply_rules_to_rows(rows: List[Dict[str, Any]], rules: List[Rule] = RULES) -> Tuple[List[Dict[str, Any]], int]:
+    """Row-by-row counterpart of ``apply_rules`` for the stdlib ``csv`` engine.
+
+    Args:
+        rows: Formatted input rows
+        rules: Rules to apply, in order
+
+    Returns:
+        Tuple of (validated rows, number of dropped rows)
+    """
+    dropped = [False] * len(rows)
+    fixes = []
+    for rule in rules:
+        hits = [i for i, row in enumerate(rows) if not dropped[i] and rule.row_check(row)]
+        if not hits:
+            continue
+        groups: Dict[Any, List[Any]] = {}
+        for i in hits:
+            value = rows[i][rule.group_by] if rule.group_by else None
+            groups.setdefault(value, []).append(rows[i]['InvoiceNumber'])
+        _log(rule, groups)
+        if rule.drop:
+            for i in hits:
+                dropped[i] = True
+        if rule.row_fix is not None:
+            fixes.append((rule.row_fix, hits))
+
+    for row_fix, hits in fixes:
+        for i in hits:
+            row_fix(rows[i])
+    kept = [row for row, drop in zip(rows, dropped) if not drop]
+    return kept, len(rows) - len(kept)
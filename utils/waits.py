@@ -0,0 +1,160 @@
+"""Event-driven waits used by page objects instead of fixed sleeps.
+
+Each wait polls a real readiness condition at a short interval and returns as
+soon as it holds. Waits return ``False`` on timeout instead of raising, so they
+can be dropped in wherever a ``time.sleep`` used to pad an interaction.
+"""
+
+from typing import Callable, Optional, Tuple
+
+from loguru import logger
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.support.ui import WebDriverWait
+
+# Constants
+POLL_INTERVAL = 0.05  # seconds
+DEFAULT_TIMEOUT = 5  # seconds
+DOM_QUIET_MS = 150  # DOM counts as settled after this long without mutations
+OVERLAY_SELECTOR = ".fe_c_overlay__dialog, .fe_c_overlay__backdrop, [aria-busy='true']"
+
+# Installs a MutationObserver and XHR/fetch counters once per page load and
+# returns the time since the last DOM mutation, the number of requests in flight
+# and the page clock.
+_PROBE_SCRIPT = """
+var w = window;
+if (!w.__rcmWait) {
+    var state = {lastMutation: Date.now(), pending: 0};
+    w.__rcmWait = state;
+    new MutationObserver(function () { state.lastMutation = Date.now(); })
+        .observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+
+    var send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        state.pending++;
+        this.addEventListener('loadend', function () { state.pending--; state.lastMutation = Date.now(); });
+        return send.apply(this, arguments);
+    };
+    if (w.fetch) {
+        var fetch = w.fetch;
+        w.fetch = function () {
+            state.pending++;
+            return fetch.apply(this, arguments).finally(function () {
+                state.pending--;
+                state.lastMutation = Date.now();
+            });
+        };
+    }
+    return null;
+}
+return [Date.now() - w.__rcmWait.lastMutation, w.__rcmWait.pending, Date.now()];
+"""
+
+_OVERLAY_SCRIPT = """
+var nodes = document.querySelectorAll(arguments[0]);
+for (var i = 0; i < nodes.length; i++) {
+    if (nodes[i].offsetParent !== null) { return true; }
+}
+return false;
+"""
+
+
+def wait_until(
+    driver,
+    condition: Callable,
+    timeout: float = DEFAULT_TIMEOUT,
+    description: str = "condition"
+):
+    """Poll ``condition(driver)`` until it returns a truthy value.
+
+    Args:
+        driver: Selenium WebDriver instance
+        condition: Callable taking the driver, as for ``WebDriverWait.until``
+        timeout: Maximum seconds to wait
+        description: Text used in the debug log on timeout
+
+    Returns:
+        The condition's truthy result, or False on timeout
+    """
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=POLL_INTERVAL).until(condition)
+    except TimeoutException:
+        logger.debug(f"Timed out after {timeout}s waiting for {description}")
+        return False
+
+
+def _probe(driver) -> Optional[Tuple[int, int, int]]:
+    try:
+        return driver.execute_script(_PROBE_SCRIPT)
+    except WebDriverException:
+        # Page is mid-navigation; try again on the next poll
+        return None
+
+
+def wait_for_dom_settled(driver, quiet_ms: int = DOM_QUIET_MS, timeout: float = DEFAULT_TIMEOUT) -> bool:
+    """Wait until the DOM has gone ``quiet_ms`` without any mutation."""
+    def settled(d):
+        probe = _probe(d)
+        return probe is not None and probe[0] >= quiet_ms
+    return bool(wait_until(driver, settled, timeout, "DOM to settle"))
+
+
+def wait_for_network_idle(driver, timeout: float = DEFAULT_TIMEOUT) -> bool:
+    """Wait until no XHR or fetch request is in flight."""
+    def idle(d):
+        probe = _probe(d)
+        return probe is not None and probe[1] <= 0
+    return bool(wait_until(driver, idle, timeout, "network idle"))
+
+
+def page_time(driver) -> Optional[int]:
+    """Return the page clock in ms (``Date.now()``), to pass to ``is_idle`` as ``since``."""
+    try:
+        return driver.execute_script("return Date.now();")
+    except WebDriverException:
+        return None
+
+
+def is_idle(driver, quiet_ms: int = DOM_QUIET_MS, since: Optional[int] = None) -> bool:
+    """Return True if no request is in flight and the DOM has gone ``quiet_ms`` without mutation.
+
+    With ``since`` (a ``page_time`` value) the page must also have been running for
+    ``quiet_ms`` after that moment, so a page that was already quiet before the
+    triggering action does not count as idle straight away.
+    """
+    probe = _probe(driver)
+    if probe is None or probe[1] > 0 or probe[0] < quiet_ms:
+        return False
+    return since is None or probe[2] - since >= quiet_ms
+
+
+def wait_for_idle(driver, quiet_ms: int = DOM_QUIET_MS, timeout: float = DEFAULT_TIMEOUT) -> bool:
+    """Wait until no request is in flight and the DOM has settled, in one script call per poll."""
+    return bool(wait_until(driver, lambda d: is_idle(d, quiet_ms), timeout, "page to become idle"))
+
+
+def wait_for_value(driver, locator: tuple, expected: Optional[str] = None, timeout: float = DEFAULT_TIMEOUT) -> bool:
+    """Wait until a field's value is committed.
+
+    Args:
+        driver: Selenium WebDriver instance
+        locator: Locator tuple of the input field
+        expected: Value to wait for; None waits for any non-empty value
+        timeout: Maximum seconds to wait
+    """
+    def committed(d):
+        try:
+            value = d.find_element(*locator).get_attribute("value")
+        except WebDriverException:
+            return False
+        return value == expected if expected is not None else bool(value)
+    return bool(wait_until(driver, committed, timeout, f"value of {locator} to commit"))
+
+
+def wait_for_overlay_gone(driver, selector: str = OVERLAY_SELECTOR, timeout: float = DEFAULT_TIMEOUT) -> bool:
+    """Wait until no element matching ``selector`` is visible."""
+    def gone(d):
+        try:
+            return not d.execute_script(_OVERLAY_SCRIPT, selector)
+        except WebDriverException:
+            return False
+    return bool(wait_until(driver, gone, timeout, f"overlay '{selector}' to close"))